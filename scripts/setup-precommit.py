@@ -7,15 +7,20 @@ This script installs and configures pre-commit hooks with security-first approac
 Cross-platform compatible (Linux, macOS, Windows)
 
 Author: Tosin Akinosho
-Usage: python scripts/setup-precommit.py
+Usage: python scripts/setup-precommit.py [--run-checks] [--all-files]
 """
 
+import argparse
+import functools
 import os
-import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Files passed to a single `pre-commit run --files` invocation
+PRECOMMIT_FILES_PER_RUN = 100
+
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -28,8 +33,11 @@ class Colors:
     NC = "\033[0m"  # No Color
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def supports_color():
-        """Check if terminal supports colors"""
+        """Check if terminal supports colors (probed once)"""
+        if not sys.stdout.isatty():
+            return False
         if os.name == "nt":
             # Enable ANSI colors on Windows 10+
             try:
@@ -42,10 +50,11 @@ class Colors:
                 return False
         return True
 
-
-# Disable colors on Windows if not supported
-if not Colors.supports_color():
-    Colors.RED = Colors.GREEN = Colors.YELLOW = Colors.BLUE = Colors.CYAN = Colors.NC = ""
+    @classmethod
+    def init(cls):
+        """Disable colors if the terminal doesn't support them"""
+        if not cls.supports_color():
+            cls.RED = cls.GREEN = cls.YELLOW = cls.BLUE = cls.CYAN = cls.NC = ""
 
 
 def print_header():
@@ -82,13 +91,13 @@ def print_info(msg):
 
 
 def run_command(cmd, check=True, capture_output=False):
-    """Run a shell command"""
+    """Run a command given as an argv list (no shell)"""
     try:
         if capture_output:
-            result = subprocess.run(cmd, shell=True, check=check, capture_output=True, text=True)
+            result = subprocess.run(cmd, check=check, capture_output=True, text=True)
             return result.stdout.strip()
         else:
-            subprocess.run(cmd, shell=True, check=check)
+            subprocess.run(cmd, check=check)
             return True
     except subprocess.CalledProcessError:
         if check:
@@ -96,14 +105,54 @@ def run_command(cmd, check=True, capture_output=False):
         return False
 
 
+def build_path_index():
+    """Collect the executable names found on PATH in a single scan"""
+    index = set()
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            entries = os.listdir(directory or ".")
+        except OSError:
+            continue
+        if os.name == "nt":
+            entries = [entry.lower() for entry in entries]
+        index.update(entries)
+    return index
+
+
+def on_path(name, path_index):
+    """Check whether an executable is available using a PATH index"""
+    if os.name == "nt":
+        extensions = os.environ.get("PATHEXT", ".EXE;.CMD;.BAT").lower().split(";")
+        return any(f"{name.lower()}{ext}" in path_index for ext in ["", *extensions])
+    return name in path_index
+
+
+def get_pip_cache_dir():
+    """Get the pip cache directory shared across setup runs"""
+    cache_dir = os.getenv("PIP_CACHE_DIR") or str(Path.home() / ".cache" / "pip-precommit-setup")
+    return Path(cache_dir).expanduser()
+
+
+def pip_install(venv_pip, packages):
+    """Install packages into the venv using the shared pip cache"""
+    env = os.environ.copy()
+    env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"  # Skip pip's self-update check
+    subprocess.run(
+        [str(venv_pip), "install", "--cache-dir", str(get_pip_cache_dir())] + list(packages),
+        check=True,
+        capture_output=True,
+        env=env,
+    )
+
+
 def check_git_repo():
     """Check if running in a git repository"""
     print_step("Checking Git repository...")
     try:
-        run_command("git rev-parse --git-dir", capture_output=True)
+        run_command(["git", "rev-parse", "--git-dir"], capture_output=True)
         print_success("Git repository detected")
         return True
-    except subprocess.CalledProcessError:
+    except (subprocess.CalledProcessError, FileNotFoundError):
         print_error("Not a git repository!")
         print("Please run this script from the root of the repository.")
         return False
@@ -124,7 +173,7 @@ def check_python():
     return True
 
 
-def setup_venv():
+def setup_venv(path_index):
     """Set up Python virtual environment"""
     print_step("\nSetting up Python virtual environment...")
 
@@ -137,7 +186,7 @@ def setup_venv():
 
         # Prefer Python 3.11 if available
         python_cmd = sys.executable
-        if shutil.which("python3.11"):
+        if on_path("python3.11", path_index):
             python_cmd = "python3.11"
             print_info("Using Python 3.11 for venv")
 
@@ -172,13 +221,13 @@ def install_precommit(venv_pip, venv_precommit):
 
     if venv_precommit.exists():
         try:
-            version = run_command(f"{venv_precommit} --version", capture_output=True)
+            version = run_command([str(venv_precommit), "--version"], capture_output=True)
             print_info(f"pre-commit {version} already installed")
         except Exception:
             print_info("pre-commit already installed")
     else:
         print_info("Installing pre-commit via pip...")
-        subprocess.run([str(venv_pip), "install", "pre-commit"], check=True, capture_output=True)
+        pip_install(venv_pip, ["pre-commit"])
         print_success("pre-commit installed")
 
     return True
@@ -190,8 +239,17 @@ def install_python_tools(venv_pip):
 
     tools = ["black", "isort", "flake8", "mypy", "bandit", "detect-secrets"]
 
-    print_info(f"Installing {', '.join(tools)}...")
-    subprocess.run([str(venv_pip), "install"] + tools, check=True, capture_output=True)
+    # Only hand pip the tools the venv doesn't already provide, in one invocation
+    venv_bin = venv_pip.parent
+    suffix = ".exe" if os.name == "nt" else ""
+    missing = [tool for tool in tools if not (venv_bin / f"{tool}{suffix}").exists()]
+
+    if not missing:
+        print_info("All Python tools already installed")
+        return True
+
+    print_info(f"Installing {', '.join(missing)}...")
+    pip_install(venv_pip, missing)
 
     print_success("All Python tools installed")
     return True
@@ -258,21 +316,21 @@ def initialize_secrets_baseline(venv_dir):
     return True
 
 
-def check_additional_deps():
+def check_additional_deps(path_index):
     """Check for additional dependencies"""
     print_step("\nChecking additional dependencies...")
 
     # Check markdownlint
-    if shutil.which("markdownlint"):
+    if on_path("markdownlint", path_index):
         print_info("markdownlint already installed")
     else:
         print_warning("markdownlint not installed (optional - requires Node.js)")
         print_info("To install: npm install -g markdownlint-cli")
 
     # Check gitleaks
-    if shutil.which("gitleaks"):
+    if on_path("gitleaks", path_index):
         try:
-            run_command("gitleaks version", capture_output=True)
+            run_command(["gitleaks", "version"], capture_output=True)
             print_success("gitleaks detected")
         except Exception:
             print_success("gitleaks detected")
@@ -287,14 +345,34 @@ def check_additional_deps():
     return True
 
 
-def run_initial_checks(venv_precommit):
-    """Run initial pre-commit checks"""
+def get_staged_files():
+    """Get the list of files staged for commit"""
+    try:
+        output = run_command(["git", "diff", "--cached", "--name-only"], capture_output=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+    return [line for line in output.splitlines() if line]
+
+
+def run_initial_checks(venv_precommit, all_files=False):
+    """Run initial pre-commit checks on staged files (or all files)"""
     print_step("\nRunning initial pre-commit checks...")
     print(f"\n{Colors.YELLOW}This may take a few minutes on first run...{Colors.NC}\n")
 
+    staged_files = [] if all_files else get_staged_files()
+
     try:
-        subprocess.run([str(venv_precommit), "run", "--all-files"], check=False)
-        success = True
+        if staged_files:
+            print_info(f"Checking {len(staged_files)} staged file(s)")
+            # Chunk the file list to stay under command-line length limits
+            success = True
+            for start in range(0, len(staged_files), PRECOMMIT_FILES_PER_RUN):
+                chunk = staged_files[start : start + PRECOMMIT_FILES_PER_RUN]
+                result = subprocess.run([str(venv_precommit), "run", "--files", *chunk])
+                success = success and result.returncode == 0
+        else:
+            result = subprocess.run([str(venv_precommit), "run", "--all-files"])
+            success = result.returncode == 0
     except Exception:
         success = False
 
@@ -328,6 +406,11 @@ def print_summary(venv_dir):
 
     print_success("Pre-commit hooks are now installed and configured\n")
 
+    print(f"{Colors.CYAN}Pip Cache:{Colors.NC}")
+    print(f"  {get_pip_cache_dir()}")
+    print("  Persist this directory in CI (e.g. actions/cache keyed on")
+    print("  hashFiles('.pre-commit-config.yaml')) to skip wheel downloads.\n")
+
     # Determine venv bin directory based on platform
     if os.name == "nt":
         venv_bin = f"{venv_dir}\\Scripts\\"
@@ -372,8 +455,57 @@ def print_summary(venv_dir):
     print(f"\n{Colors.GREEN}You're all set! Happy coding! 🚀{Colors.NC}\n")
 
 
+def run_steps(steps):
+    """Run setup steps in order, stopping at the first failure"""
+    for name, func in steps:
+        try:
+            if not func():
+                print_error(f"\nSetup failed at step: {name}")
+                return False
+        except Exception as e:
+            print_error(f"\nError during {name}: {str(e)}")
+            return False
+    return True
+
+
+def run_steps_concurrently(steps):
+    """Run independent setup steps in parallel and report every failure"""
+    success = True
+    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+        futures = {executor.submit(func): name for name, func in steps}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                if not future.result():
+                    print_error(f"\nSetup failed at step: {name}")
+                    success = False
+            except Exception as e:
+                print_error(f"\nError during {name}: {str(e)}")
+                success = False
+    return success
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="Install and configure pre-commit hooks")
+    parser.add_argument(
+        "--run-checks",
+        action="store_true",
+        help="Run pre-commit hooks once after setup (slow on a cold hook cache)",
+    )
+    parser.add_argument(
+        "--all-files",
+        action="store_true",
+        help="Run the initial checks on every file instead of only staged files "
+        "(implies --run-checks)",
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main execution"""
+    args = parse_args()
+    Colors.init()
     print_header()
 
     # Initial checks
@@ -386,32 +518,47 @@ def main():
         print_error(f"\nError during initial checks: {str(e)}")
         return 1
 
+    # Scan PATH once for all executable probes
+    path_index = build_path_index()
+
     # Setup venv and get paths
     try:
-        venv_pip, venv_python, venv_precommit = setup_venv()
+        venv_pip, venv_python, venv_precommit = setup_venv(path_index)
         venv_dir = Path(".venv")
     except Exception as e:
         print_error(f"\nError setting up virtual environment: {str(e)}")
         return 1
 
-    # Install and configure steps
-    steps = [
-        ("Pre-commit", lambda: install_precommit(venv_pip, venv_precommit)),
-        ("Python Tools", lambda: install_python_tools(venv_pip)),
+    # Independent install/probe steps run concurrently. Both pip installs
+    # target the same venv, so they stay sequential within one task.
+    install_steps = [
+        (
+            "Pre-commit and Python Tools",
+            lambda: install_precommit(venv_pip, venv_precommit) and install_python_tools(venv_pip),
+        ),
+        ("Additional Dependencies", lambda: check_additional_deps(path_index)),
+    ]
+    if not run_steps_concurrently(install_steps):
+        return 1
+
+    # Configure steps depend on the installed tools
+    configure_steps = [
         ("Git Hooks", lambda: install_git_hooks(venv_precommit)),
         ("Secrets Baseline", lambda: initialize_secrets_baseline(venv_dir)),
-        ("Additional Dependencies", check_additional_deps),
-        ("Initial Checks", lambda: run_initial_checks(venv_precommit)),
     ]
+    if args.run_checks or args.all_files:
+        configure_steps.append(
+            ("Initial Checks", lambda: run_initial_checks(venv_precommit, args.all_files))
+        )
+    if not run_steps(configure_steps):
+        return 1
 
-    for name, func in steps:
-        try:
-            if not func():
-                print_error(f"\nSetup failed at step: {name}")
-                return 1
-        except Exception as e:
-            print_error(f"\nError during {name}: {str(e)}")
-            return 1
+    if not (args.run_checks or args.all_files):
+        print_step("\nSkipping initial pre-commit checks...")
+        print_info(
+            "Hooks build their environments on first use; run "
+            "'pre-commit run --all-files' manually when ready (or pass --run-checks)"
+        )
 
     print_summary(venv_dir)
     return 0
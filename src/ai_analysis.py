@@ -6,16 +6,454 @@ This module provides AI-powered analysis of test failures using LiteLLM
 to generate insights and potential root cause analysis.
 """
 
+import asyncio
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import itertools
 import json
 import logging
+import operator
 import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import litellm
+from utils import json_loads, parse_comma_separated
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# LiteLLM pulls in every provider SDK on import, so it is imported lazily where
+# it is used; runs without AI configured never pay that cost.
+LITELLM_AVAILABLE = importlib.util.find_spec("litellm") is not None
+
+# Provider API keys that enable AI analysis (OpenRouter, DeepSeek, and other
+# providers are supported via LiteLLM)
+PROVIDER_API_KEYS = (
+    "OPENAI_API_KEY",
+    "ANTHROPIC_API_KEY",
+    "OPENROUTER_API_KEY",
+    "DEEPSEEK_API_KEY",
+)
+
+# System prompt sent with every analysis request
+SYSTEM_PROMPT = """You are an expert QA engineer and test automation specialist analyzing Playwright test failures.
+
+CRITICAL: Respond with ONLY a valid JSON object. No markdown code blocks, no additional text, no formatting.
+
+Your response must help developers quickly understand:
+1. WHAT to fix first (priority)
+2. HOW LONG it will take (effort)
+3. WHERE to make changes (specific fixes)
+4. WHY it's failing (root cause)
+5. WHETHER it can be auto-fixed (fixability)
+
+Required JSON structure (respond with this exact structure):
+{
+  "summary": "1-2 sentence executive summary",
+  "priority_assessment": {
+    "critical": ["List critical failures blocking core functionality"],
+    "high": ["Failures affecting multiple features"],
+    "medium": ["Isolated issues or flaky tests"],
+    "low": ["Minor issues or test-only problems"]
+  },
+  "work_order": [
+    "Recommended fix order for maximum efficiency",
+    "Example: Fix test 1 first - unblocks 3 other failures"
+  ],
+  "specific_fixes": [
+    {
+      "test": "file.spec.js:line_number",
+      "issue": "What's wrong",
+      "fix": "Specific action to take",
+      "code_hint": "Suggested code change",
+      "estimated_time": "5 min | 30 min | 2 hours",
+      "complexity": "trivial | easy | moderate | complex",
+      "fixability_score": 0.85,
+      "error_pattern": "missing_await | wrong_selector | timeout | type_error | etc"
+    }
+  ],
+  "failure_categories": {
+    "test_code_issues": ["Broken selectors, bad waits"],
+    "application_bugs": ["Real bugs in the app"],
+    "infrastructure": ["Environment, network, CI issues"],
+    "flaky_tests": ["Intermittent failures"]
+  },
+  "quick_wins": [
+    "List 1-3 failures fixable in under 10 minutes"
+  ],
+  "root_cause_analysis": "Detailed explanation of underlying causes",
+  "suggested_actions": [
+    "Prioritized, specific action items",
+    "Include file:line references where possible"
+  ],
+  "test_quality_feedback": [
+    {
+      "issue": "Problem with test approach",
+      "recommendation": "How to improve reliability",
+      "benefit": "Why this matters"
+    }
+  ],
+  "confidence_score": 0.8,
+  "error_patterns": ["timeout", "selector", "network"],
+  "fixability_score": 0.75,
+  "auto_fix_prompt": "Detailed instructions for automated fixing tools"
+}
+
+Fixability Score Guidelines (0.0 - 1.0):
+- 0.9-1.0: Trivial fixes (missing await, simple typos, import errors)
+- 0.7-0.89: Easy fixes (wrong selectors, timeout adjustments, simple logic)
+- 0.5-0.69: Moderate fixes (complex selectors, test setup/teardown, timing issues)
+- 0.3-0.49: Complex fixes (business logic, race conditions, multi-step changes)
+- 0.0-0.29: Not auto-fixable (requires domain knowledge, architectural changes)
+
+Error Pattern Classifications:
+- missing_await: Async function called without await
+- wrong_selector: Element selector doesn't match DOM
+- timeout: Operation exceeded time limit
+- type_error: TypeScript/JavaScript type mismatch
+- import_error: Module import failure
+- deprecated_api: Using deprecated Playwright API
+- network_error: API/network request failed
+- assertion_error: Test expectation failed
+- flaky_timing: Intermittent timing-related failure
+
+Guidelines:
+- PRIORITIZE: Most critical/blocking failures first
+- BE SPECIFIC: Provide file:line references and exact fixes
+- ESTIMATE EFFORT: Help developers plan time
+- ASSESS FIXABILITY: Rate how suitable for automated fixing
+- CLASSIFY PATTERNS: Identify error types for pattern matching
+- GROUP RELATED: Identify failures with common causes
+- QUICK WINS: Highlight fast fixes for immediate progress
+- BE ACTIONABLE: Every suggestion should be immediately actionable
+- PROVIDE AUTO-FIX GUIDANCE: Include prompts for automated tools
+
+Remember: Developers need to know WHAT to fix, in WHAT ORDER, HOW LONG it will take, and IF it can be automated."""
+
+# Templates for the user prompt sent with each analysis
+# Run-wide context comes first and the per-request failure count last, so
+# every request in a run shares the longest possible prompt prefix (providers
+# reuse cached prefill for an identical prefix)
+PROMPT_HEADER_TEMPLATE = (
+    "Please analyze the following Playwright test failures:\n\n"
+    "Test Run Context:\n"
+    "- Total Tests: {total_tests}\n"
+    "- Playwright Version: {playwright_version}\n"
+    "- Projects: {projects}\n"
+    "- Workers: {workers}\n"
+    "- Failed Tests: {failed_tests}\n\n"
+    "Failure Details:\n"
+)
+PROMPT_FAILURE_TEMPLATE = (
+    "\n{index}. Test: {test_name}\n"
+    "   File: {file_path}\n"
+    "   Duration: {duration}ms\n"
+    "   Retries: {retry_count}\n"
+    "   Error: {error_message}\n"
+    "   Stack Trace: {stack_trace}\n"
+)
+# Failure block for a cluster representative, noting how many it stands for
+PROMPT_CLUSTER_FAILURE_TEMPLATE = (
+    PROMPT_FAILURE_TEMPLATE + "   Similar Failures: {count} more with this error\n"
+)
+
+# Failure fields included in the analysis prompt, with their defaults
+PROMPT_FAILURE_DEFAULTS = {
+    "test_name": "Unknown Test",
+    "file_path": "unknown",
+    "error_message": "No error message",
+    "stack_trace": "",
+    "duration": 0,
+    "retry_count": 0,
+}
+get_prompt_failure_fields = operator.itemgetter(*PROMPT_FAILURE_DEFAULTS)
+
+# Failure fields coerced to str when failures are normalized
+PROMPT_FAILURE_TEXT_FIELDS = ("test_name", "file_path", "error_message", "stack_trace")
+
+# Common Playwright failure signatures, matched at the leftmost position in one scan
+ERROR_CATEGORY_PATTERNS = (
+    ("network", r"net::ERR_\w+|ECONNREFUSED|ECONNRESET|ENOTFOUND|socket hang up"),
+    ("selector", r"waiting for (?:selector|locator)|element not found|strict mode violation"),
+    ("timeout", r"timeout|timed out"),
+    ("assertion", r"expect\(|assertionerror|\bto(?:Be|Equal|Have|Contain)\w*"),
+    ("navigation", r"navigation|frame was detached"),
+)
+ERROR_CATEGORY_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in ERROR_CATEGORY_PATTERNS),
+    re.IGNORECASE,
+)
+
+# Shared decoder for pulling the first JSON object out of surrounding text
+JSON_DECODER = json.JSONDecoder()
+
+# Characters that change JSON nesting or string state
+JSON_STRUCTURE_PATTERN = re.compile(r'[{}"\\]')
+
+# Expected JSON type, and item type for arrays, of the analysis fields that
+# are used as-is; fields that don't match are dropped and fall back to their
+# defaults rather than breaking the issue formatter
+ANALYSIS_FIELD_TYPES = {
+    "summary": (str, None),
+    "root_cause_analysis": (str, None),
+    "suggested_actions": (list, str),
+    "error_patterns": (list, str),
+    "priority_assessment": (dict, None),
+    "work_order": (list, str),
+    "specific_fixes": (list, dict),
+    "failure_categories": (dict, None),
+    "quick_wins": (list, str),
+    "test_quality_feedback": (list, dict),
+    "auto_fix_prompt": (str, None),
+}
+
+# Score fields converted with float(); unlike the fields above, null or any
+# non-number (including booleans) is dropped so the default applies
+NUMERIC_ANALYSIS_FIELDS = ("confidence_score", "fixability_score")
+
+# Separators around a streamed JSON object's members
+JSON_MEMBER_GAP_PATTERN = re.compile(r"[\s,]*")
+JSON_KEY_SEPARATOR_PATTERN = re.compile(r"\s*:\s*")
+
+# Bulleted ("- ", "* ", "• ") or numbered ("1. ", "2) ") list items in free
+# text, one per line ([^\S\n] is whitespace other than a line break)
+BULLET_PATTERN = re.compile(r"^[^\S\n]*(?:[-*•]|\d+[.)])[^\S\n]+(.*\S)", re.MULTILINE)
+
+# First non-blank line of free text
+FIRST_LINE_PATTERN = re.compile(r"\S.*")
+
+# GitHub issue rendering of AI analysis results
+ANALYSIS_HEADER_TEMPLATE = "## 🤖 AI-Powered Analysis & Recommendations\n\n**Summary**: {summary}\n"
+# (key, label) pairs in display order; tuples so shared rendering is read-only
+PRIORITY_LABELS = (
+    ("critical", "🔴 Critical"),
+    ("high", "🟠 High"),
+    ("medium", "🟡 Medium"),
+    ("low", "🟢 Low"),
+)
+FAILURE_CATEGORY_LABELS = (
+    ("test_code_issues", "🧪 Test Code Issues"),
+    ("application_bugs", "🐛 Application Bugs"),
+    ("infrastructure", "🏗️ Infrastructure"),
+    ("flaky_tests", "🎲 Flaky Tests"),
+)
+SPECIFIC_FIX_TEMPLATE = (
+    "**{test}**\n"
+    "- **Issue**: {issue}\n"
+    "- **Fix**: {fix}\n"
+    "{code_hint}"
+    "- **Effort**: {estimated_time} ({complexity} complexity)"
+)
+TEST_QUALITY_TEMPLATE = (
+    "**Issue**: {issue}\n**Recommendation**: {recommendation}\n**Benefit**: {benefit}"
+)
+ANALYSIS_FOOTER_TEMPLATE = (
+    "---\n"
+    "*Analysis generated by {model}{tier} - Confidence: {confidence:.1%}{raw}*\n"
+    "{fixability}"
+    "\n"
+    "💬 **Need help?** Comment on this issue with questions about the analysis."
+)
+FIXABILITY_TEMPLATE = "*{emoji} Auto-fix feasibility: {score:.1%}*\n"
+
+
+def _markdown_section(heading: str, items: List[str], separator: str = "\n") -> str:
+    """Render a "### heading" block followed by its items and a blank line."""
+    if not items:
+        return f"### {heading}\n\n"
+    return f"### {heading}\n\n{separator.join(items)}\n"
+
+
+def _truncate(text: Any, max_chars: int) -> str:
+    """Truncate text to max_chars, marking that it was shortened."""
+    text = str(text) if text is not None else ""
+    if len(text) > max_chars:
+        return text[:max_chars] + "... (truncated)"
+    return text
+
+
+def get_cache_path(key: str) -> Optional[Path]:
+    """Get the AI_CACHE_DIR file for a cache key, if caching is enabled."""
+    cache_dir = os.getenv("AI_CACHE_DIR")
+    if not cache_dir:
+        return None
+    return Path(cache_dir).expanduser() / f"{key}.json"
+
+
+def read_cached_response(cache_path: Optional[Path], ttl_seconds: float) -> Optional[str]:
+    """Read a cached LLM response, ignoring missing, expired or unreadable entries."""
+    if not cache_path:
+        return None
+
+    try:
+        with open(cache_path, "rb") as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > ttl_seconds:
+                return None
+            return json_loads(f.read())["response"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.debug(f"Ignoring unreadable AI cache entry {cache_path}: {e}")
+        return None
+
+
+def write_cached_response(cache_path: Optional[Path], model: str, response_text: str) -> None:
+    """Atomically store an LLM response in the disk cache."""
+    if not cache_path:
+        return
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "response": response_text}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"Failed to write AI cache entry {cache_path}: {e}")
+
+
+def extract_json_object(response_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract the JSON object from an LLM response.
+
+    Returns:
+        The decoded object, or None if the text contains no "{"
+
+    Raises:
+        ValueError: If no JSON object could be decoded from the text
+    """
+    # Fast path: bare JSON as requested by the system prompt. Only a short
+    # prefix is stripped so the full response isn't copied.
+    if response_text[:64].lstrip().startswith("{"):
+        try:
+            return json_loads(response_text)
+        except ValueError:
+            pass  # Trailing prose or similar; fall back to extraction
+
+    # Decode the first balanced object in a single pass; any markdown fence
+    # or prose before "{" and after the matching "}" is ignored. Braces in
+    # the leading prose (e.g. "use {timeout}") are skipped over.
+    start = response_text.find("{")
+    if start < 0:
+        return None
+    first_error = None
+    while start >= 0:
+        try:
+            data, _ = JSON_DECODER.raw_decode(response_text, start)
+            return data
+        except ValueError as e:
+            first_error = first_error or e
+            start = response_text.find("{", start + 1)
+    raise first_error
+
+
+def _is_number(value: Any) -> bool:
+    """Whether a decoded JSON value is a number (booleans excluded)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _JsonObjectTracker:
+    """Track streamed text to detect when the first JSON object is complete."""
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escape_pending = False
+        self._chunks: List[str] = []
+
+    def feed(self, text: str) -> bool:
+        """Consume a fragment and return True once the first object has closed."""
+        self._chunks.append(text)
+        # Position of a character escaped by a backslash in a string
+        skip = 0 if self._escape_pending else -1
+        self._escape_pending = False
+
+        for match in JSON_STRUCTURE_PATTERN.finditer(text):
+            pos = match.start()
+            if pos == skip:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == "\\":
+                    skip = pos + 1
+                    self._escape_pending = skip == len(text)
+                elif char == '"':
+                    self._in_string = False
+            elif char == "{":
+                self._depth += 1
+            elif self._depth:
+                # Quotes and braces in prose before the object are ignored
+                if char == '"':
+                    self._in_string = True
+                elif char == "}":
+                    self._depth -= 1
+                    # Balanced braces in leading prose (e.g. "use {timeout}")
+                    # also close at depth 0, so only stop once the text decodes
+                    if not self._depth and self._decodes():
+                        return True
+        return False
+
+    def _decodes(self) -> bool:
+        """Whether the text seen so far contains a complete JSON object."""
+        try:
+            return isinstance(extract_json_object("".join(self._chunks)), dict)
+        except ValueError:
+            return False
+
+
+class _JsonFieldReader:
+    """Decode the top-level fields of a streamed JSON object as each completes."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        # Offset of the next unread member, once the opening "{" has arrived
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume a fragment and return the fields completed by it."""
+        self._buffer += text
+        fields: List[Tuple[str, Any]] = []
+        # A member is only complete once a following "," or "}" has arrived
+        if self.done or ("," not in text and "}" not in text):
+            return fields
+
+        buffer = self._buffer
+        if self._pos is None:
+            start = buffer.find("{")
+            if start < 0:
+                return fields
+            self._pos = start + 1
+
+        while True:
+            pos = JSON_MEMBER_GAP_PATTERN.match(buffer, self._pos).end()
+            if buffer.startswith("}", pos):
+                self.done = True
+                break
+            try:
+                key, pos = JSON_DECODER.raw_decode(buffer, pos)
+                separator = JSON_KEY_SEPARATOR_PATTERN.match(buffer, pos)
+                if not separator:
+                    break
+                value, pos = JSON_DECODER.raw_decode(buffer, separator.end())
+            except ValueError:
+                break  # Incomplete (or malformed) member; wait for more text
+            # Numbers can still grow, so wait for the text after the value
+            if JSON_MEMBER_GAP_PATTERN.match(buffer, pos).end() >= len(buffer):
+                break
+            fields.append((key, value))
+            self._pos = pos
+        return fields
+
+
+@dataclass(slots=True, frozen=True)
 class AIAnalysisResult:
     """Result of AI analysis of test failures."""
 
@@ -68,54 +506,204 @@ class AIAnalyzer:
         "default": 0.60,
     }
 
-    def __init__(self, model: str = "gpt-4o-mini", max_tokens: int = 2500):
+    # Lower-cased once for the partial-match fallback in _get_model_multiplier
+    _NORMALIZED_MULTIPLIERS = tuple(
+        (key.lower(), value) for key, value in MODEL_CONFIDENCE_MULTIPLIERS.items()
+    )
+
+    # Shared by every request (and counted once for the token budget), so the
+    # same string object is reused rather than rebuilt per call
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    # Seconds to wait for an LLM response
+    REQUEST_TIMEOUT = 30
+
+    # Retries (with LiteLLM's exponential backoff) for rate limits, timeouts
+    # and transient server errors; other errors fail immediately
+    MAX_RETRIES = 3
+
+    # Ask for a bare JSON object (JSON mode). LiteLLM drops the parameter for
+    # providers without support, so response parsing keeps its text fallback.
+    RESPONSE_FORMAT = {"type": "json_object"}
+
+    # Tokens kept free between the prompt and the model's context window
+    CONTEXT_SAFETY_TOKENS = 256
+
+    # Prompt size limits (characters) to keep requests within the token budget
+    MAX_PROMPT_FAILURES = 5
+    MAX_TEST_NAME_CHARS = 120
+    MAX_FILE_PATH_CHARS = 160
+    MAX_ERROR_MESSAGE_CHARS = 400
+    MAX_STACK_TRACE_CHARS = 500
+    PROMPT_CHARS_PER_FAILURE = 1200
+
+    # Token caps applied within the character limits when the model's
+    # tokenizer is known, so dense traces cost a predictable number of tokens
+    MAX_ERROR_MESSAGE_TOKENS = 100
+    MAX_STACK_TRACE_TOKENS = 150
+
+    # Failures whose SimHash fingerprints differ in at most this many bits are
+    # shown to the LLM once, with a count of the similar ones
+    SIMHASH_MAX_DISTANCE = 3
+
+    # LiteLLM settings are process-wide, so they are applied once, even when
+    # analyzers are created from several threads
+    _litellm_configured = False
+    _litellm_setup_lock = threading.Lock()
+
+    # Lower temperature for more consistent (and cacheable) analysis
+    TEMPERATURE = 0.3
+
+    # In-process LRU memo of LLM responses keyed by prompt hash
+    RESPONSE_MEMO_SIZE = 256
+
+    # Age after which AI_CACHE_DIR entries are ignored and re-requested
+    CACHE_TTL_SECONDS = 24 * 60 * 60
+    _response_memo: "OrderedDict[str, str]" = OrderedDict()
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        max_tokens: int = 2500,
+        request_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        fallback_models: Optional[List[str]] = None,
+    ):
         """
         Initialize the AI analyzer.
 
         Args:
             model: The LLM model to use (supports OpenAI, Anthropic, etc.)
             max_tokens: Maximum tokens for the response (increased to support detailed analysis)
+            request_timeout: Seconds before an LLM request is abandoned and retried
+                (defaults to REQUEST_TIMEOUT)
+            max_retries: Retries for timeouts and transient errors (defaults to MAX_RETRIES)
+            fallback_models: Models to try, in order, if the primary model still fails
         """
         self.model = model
         self.max_tokens = max_tokens
-        self.logger = logging.getLogger(__name__)
+        self.request_timeout = self.REQUEST_TIMEOUT if request_timeout is None else request_timeout
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.fallback_models = list(fallback_models or [])
+        self.logger = logger
 
         # Determine model tier and confidence multiplier
-        self.model_multiplier = self._get_model_multiplier(model)
-        self.model_tier = self._get_model_tier(model)
+        self.model_multiplier, self.model_tier = self._classify_model(model)
 
         # Configure LiteLLM
         self._setup_litellm()
 
-    def _get_model_multiplier(self, model: str) -> float:
+        self._system_message = self._build_system_message(model)
+
+        # Context window and system prompt size, looked up once per analyzer
+        self._context_window, self._max_output_tokens, self._system_prompt_tokens = (
+            self._get_token_budget(model)
+        )
+
+    @classmethod
+    def _build_system_message(cls, model: str) -> Dict[str, Any]:
+        """Build the system message, marking it cacheable for Anthropic models.
+
+        OpenAI and DeepSeek cache identical prompt prefixes automatically;
+        Anthropic only caches content blocks flagged with cache_control.
+        """
+        if "claude" not in model.lower():
+            return {"role": "system", "content": cls.SYSTEM_PROMPT}
+        return {
+            "role": "system",
+            "content": [
+                {
+                    "type": "text",
+                    "text": cls.SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+
+    def _get_token_budget(self, model: str) -> Tuple[Optional[int], Optional[int], int]:
+        """Look up the model's token limits and count the system prompt tokens."""
+        import litellm
+
+        try:
+            model_info = litellm.get_model_info(model)
+            system_prompt_tokens = litellm.token_counter(model=model, text=self.SYSTEM_PROMPT)
+        except Exception as e:
+            # Unknown to LiteLLM's model map; requests use max_tokens as-is
+            self.logger.debug(f"No token limits for {model}: {e}")
+            return None, None, 0
+
+        return (
+            model_info.get("max_input_tokens"),
+            model_info.get("max_output_tokens"),
+            system_prompt_tokens,
+        )
+
+    def _response_token_limit(self, prompt: str) -> int:
+        """Cap max_tokens so the prompt plus response fits the context window."""
+        limit = self.max_tokens
+        if self._max_output_tokens:
+            limit = min(limit, self._max_output_tokens)
+        if self._context_window:
+            import litellm
+
+            prompt_tokens = self._system_prompt_tokens + litellm.token_counter(
+                model=self.model, text=prompt
+            )
+            available = self._context_window - prompt_tokens - self.CONTEXT_SAFETY_TOKENS
+            limit = max(1, min(limit, available))
+        return limit
+
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def _get_model_multiplier(cls, model: str) -> float:
         """Get confidence multiplier for the given model."""
         # Try exact match first
-        if model in self.MODEL_CONFIDENCE_MULTIPLIERS:
-            return self.MODEL_CONFIDENCE_MULTIPLIERS[model]
+        if model in cls.MODEL_CONFIDENCE_MULTIPLIERS:
+            return cls.MODEL_CONFIDENCE_MULTIPLIERS[model]
 
         # Try partial match (e.g., "openrouter/deepseek/deepseek-chat" contains "deepseek")
         model_lower = model.lower()
-        for key, value in self.MODEL_CONFIDENCE_MULTIPLIERS.items():
-            if key.lower() in model_lower or model_lower in key.lower():
+        for key, value in cls._NORMALIZED_MULTIPLIERS:
+            if key in model_lower or model_lower in key:
                 return value
 
         # Return default for unknown models
-        return self.MODEL_CONFIDENCE_MULTIPLIERS["default"]
+        return cls.MODEL_CONFIDENCE_MULTIPLIERS["default"]
 
-    def _get_model_tier(self, model: str) -> str:
-        """Get the tier classification for the model."""
+    def _classify_model(self, model: str) -> Tuple[float, str]:
+        """Get the confidence multiplier and tier classification for the model."""
         multiplier = self._get_model_multiplier(model)
         if multiplier >= 0.95:
-            return "premium"
+            tier = "premium"
         elif multiplier >= 0.80:
-            return "balanced"
+            tier = "balanced"
         elif multiplier >= 0.65:
-            return "budget"
+            tier = "budget"
         else:
-            return "basic"
+            tier = "basic"
+        return multiplier, tier
+
+    def _get_model_tier(self, model: str) -> str:
+        """Get the tier classification for the model."""
+        return self._classify_model(model)[1]
+
+    @classmethod
+    def _setup_litellm(cls) -> None:
+        """Setup LiteLLM configuration once per process."""
+        if cls._litellm_configured:
+            return
+
+        with cls._litellm_setup_lock:
+            if not cls._litellm_configured:
+                cls._configure_litellm()
+                cls._litellm_configured = True
+
+    @classmethod
+    def _configure_litellm(cls) -> None:
+        """Apply the process-wide LiteLLM settings."""
+        import httpx
+        import litellm
 
-    def _setup_litellm(self) -> None:
-        """Setup LiteLLM configuration."""
         # LiteLLM will automatically use environment variables for API keys
         # OPENAI_API_KEY, ANTHROPIC_API_KEY, etc.
 
@@ -126,8 +714,15 @@ class AIAnalyzer:
         litellm.drop_params = True  # Drop unsupported parameters
         litellm.modify_params = True  # Modify parameters for compatibility
 
+        # Share one pooled HTTP client so repeated calls reuse connections
+        if litellm.client_session is None:
+            litellm.client_session = httpx.Client(
+                timeout=cls.REQUEST_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=4),
+            )
+
     def analyze_failures(
-        self, failures: List[Dict[str, Any]], metadata: Dict[str, Any]
+        self, failures: List[Dict[str, Any]], metadata: Dict[str, Any], stream: bool = True
     ) -> Optional[AIAnalysisResult]:
         """
         Analyze test failures using AI to provide insights.
@@ -135,130 +730,335 @@ class AIAnalyzer:
         Args:
             failures: List of test failure data
             metadata: Additional context about the test run
+            stream: Stream the response and stop reading once the JSON object
+                is complete; False falls back to a single blocking call
 
         Returns:
             AIAnalysisResult if successful, None if analysis fails
         """
+        if not failures:
+            return None
+
         try:
             # Prepare the prompt with failure data
             prompt = self._create_analysis_prompt(failures, metadata)
 
-            # Call the LLM
-            response = litellm.completion(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=self.max_tokens,
-                temperature=0.3,  # Lower temperature for more consistent analysis
-                timeout=30,
-            )
+            # Reuse a previous response to the same prompt (e.g. CI reruns)
+            prompt_hash = self._prompt_hash(prompt)
+            cached_text = self._get_cached_response(prompt_hash)
+            if cached_text is not None:
+                self.logger.info("Using cached AI analysis")
+                return self._parse_analysis_response(cached_text)
+
+            # Stream the LLM response, keeping what arrived if the stream breaks
+            chunks: List[str] = []
+            complete = True
+            tracker = _JsonObjectTracker()
+            try:
+                for text in self._stream_completion(prompt, stream):
+                    chunks.append(text)
+                    if tracker.feed(text):
+                        break  # Skip any trailing prose after the JSON object
+            except Exception as e:
+                if not chunks:
+                    raise
+                complete = False
+                self.logger.warning(f"AI response stream interrupted, using partial response: {e}")
+
+            return self._finish_analysis(chunks, complete, prompt_hash)
+
+        except Exception as e:
+            self.logger.warning(f"AI analysis failed: {e}")
+            return None
+
+    async def analyze_failures_async(
+        self, failures: List[Dict[str, Any]], metadata: Dict[str, Any], semaphore=None
+    ) -> Optional[AIAnalysisResult]:
+        """
+        Analyze test failures with an async LLM call.
+
+        Args:
+            failures: List of test failure data
+            metadata: Additional context about the test run
+            semaphore: Optional asyncio.Semaphore bounding concurrent LLM calls
+
+        Returns:
+            AIAnalysisResult if successful, None if analysis fails
+        """
+        if not failures:
+            return None
+
+        try:
+            prompt = self._create_analysis_prompt(failures, metadata)
+
+            # Reuse a previous response to the same prompt (e.g. CI reruns)
+            prompt_hash = self._prompt_hash(prompt)
+            cached_text = self._get_cached_response(prompt_hash)
+            if cached_text is not None:
+                self.logger.info("Using cached AI analysis")
+                return self._parse_analysis_response(cached_text)
+
+            import litellm
+
+            chunks: List[str] = []
+            complete = True
+            tracker = _JsonObjectTracker()
+            async with semaphore or contextlib.nullcontext():
+                try:
+                    response = await litellm.acompletion(**self._completion_kwargs(prompt))
+                    async for chunk in response:
+                        text = chunk.choices[0].delta.content
+                        if text:
+                            chunks.append(text)
+                            if tracker.feed(text):
+                                break  # Skip any trailing prose after the JSON object
+                except Exception as e:
+                    if not chunks:
+                        raise
+                    complete = False
+                    self.logger.warning(
+                        f"AI response stream interrupted, using partial response: {e}"
+                    )
 
-            # Parse the response
-            analysis_text = response.choices[0].message.content
-            return self._parse_analysis_response(analysis_text)
+            return self._finish_analysis(chunks, complete, prompt_hash)
 
         except Exception as e:
             self.logger.warning(f"AI analysis failed: {e}")
             return None
 
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for the AI analysis."""
-        return """You are an expert QA engineer and test automation specialist analyzing Playwright test failures.
+    async def analyze_failures_batched_async(
+        self,
+        failures: List[Dict[str, Any]],
+        metadata: Dict[str, Any],
+        batch_size: Optional[int] = None,
+        max_concurrency: int = 4,
+    ) -> Optional[AIAnalysisResult]:
+        """
+        Analyze every failure by fanning batches out as concurrent async LLM calls.
 
-CRITICAL: Respond with ONLY a valid JSON object. No markdown code blocks, no additional text, no formatting.
+        Failures with the same error signature are kept in the same batch, and
+        the per-batch results are merged into a single analysis. Each batch is
+        its own request (the ``n`` parameter only samples one prompt several
+        times); every request starts with the same system prompt, so providers
+        with prefix caching bill it once across batches.
 
-Your response must help developers quickly understand:
-1. WHAT to fix first (priority)
-2. HOW LONG it will take (effort)
-3. WHERE to make changes (specific fixes)
-4. WHY it's failing (root cause)
-5. WHETHER it can be auto-fixed (fixability)
+        Args:
+            failures: List of test failure data
+            metadata: Additional context about the test run
+            batch_size: Failures per LLM call (defaults to MAX_PROMPT_FAILURES)
+            max_concurrency: Maximum number of concurrent LLM calls
 
-Required JSON structure (respond with this exact structure):
-{
-  "summary": "1-2 sentence executive summary",
-  "priority_assessment": {
-    "critical": ["List critical failures blocking core functionality"],
-    "high": ["Failures affecting multiple features"],
-    "medium": ["Isolated issues or flaky tests"],
-    "low": ["Minor issues or test-only problems"]
-  },
-  "work_order": [
-    "Recommended fix order for maximum efficiency",
-    "Example: Fix test 1 first - unblocks 3 other failures"
-  ],
-  "specific_fixes": [
-    {
-      "test": "file.spec.js:line_number",
-      "issue": "What's wrong",
-      "fix": "Specific action to take",
-      "code_hint": "Suggested code change",
-      "estimated_time": "5 min | 30 min | 2 hours",
-      "complexity": "trivial | easy | moderate | complex",
-      "fixability_score": 0.85,
-      "error_pattern": "missing_await | wrong_selector | timeout | type_error | etc"
-    }
-  ],
-  "failure_categories": {
-    "test_code_issues": ["Broken selectors, bad waits"],
-    "application_bugs": ["Real bugs in the app"],
-    "infrastructure": ["Environment, network, CI issues"],
-    "flaky_tests": ["Intermittent failures"]
-  },
-  "quick_wins": [
-    "List 1-3 failures fixable in under 10 minutes"
-  ],
-  "root_cause_analysis": "Detailed explanation of underlying causes",
-  "suggested_actions": [
-    "Prioritized, specific action items",
-    "Include file:line references where possible"
-  ],
-  "test_quality_feedback": [
-    {
-      "issue": "Problem with test approach",
-      "recommendation": "How to improve reliability",
-      "benefit": "Why this matters"
-    }
-  ],
-  "confidence_score": 0.8,
-  "error_patterns": ["timeout", "selector", "network"],
-  "fixability_score": 0.75,
-  "auto_fix_prompt": "Detailed instructions for automated fixing tools"
-}
+        Returns:
+            Merged AIAnalysisResult, or None if every batch failed
+        """
+        batch_size = batch_size or self.MAX_PROMPT_FAILURES
+        batches = self._batch_failures(failures, batch_size)
+        if not batches:
+            return None
 
-Fixability Score Guidelines (0.0 - 1.0):
-- 0.9-1.0: Trivial fixes (missing await, simple typos, import errors)
-- 0.7-0.89: Easy fixes (wrong selectors, timeout adjustments, simple logic)
-- 0.5-0.69: Moderate fixes (complex selectors, test setup/teardown, timing issues)
-- 0.3-0.49: Complex fixes (business logic, race conditions, multi-step changes)
-- 0.0-0.29: Not auto-fixable (requires domain knowledge, architectural changes)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results = await asyncio.gather(
+            *(self.analyze_failures_async(batch, metadata, semaphore) for batch in batches)
+        )
 
-Error Pattern Classifications:
-- missing_await: Async function called without await
-- wrong_selector: Element selector doesn't match DOM
-- timeout: Operation exceeded time limit
-- type_error: TypeScript/JavaScript type mismatch
-- import_error: Module import failure
-- deprecated_api: Using deprecated Playwright API
-- network_error: API/network request failed
-- assertion_error: Test expectation failed
-- flaky_timing: Intermittent timing-related failure
+        weighted_results = [
+            (result, len(batch)) for result, batch in zip(results, batches) if result
+        ]
+        if not weighted_results:
+            return None
+        return self._merge_results(weighted_results)
+
+    def analyze_failures_parallel(
+        self,
+        failures: List[Dict[str, Any]],
+        metadata: Dict[str, Any],
+        batch_size: Optional[int] = None,
+        max_concurrency: int = 4,
+    ) -> Optional[AIAnalysisResult]:
+        """
+        Synchronous wrapper around analyze_failures_batched_async.
 
-Guidelines:
-- PRIORITIZE: Most critical/blocking failures first
-- BE SPECIFIC: Provide file:line references and exact fixes
-- ESTIMATE EFFORT: Help developers plan time
-- ASSESS FIXABILITY: Rate how suitable for automated fixing
-- CLASSIFY PATTERNS: Identify error types for pattern matching
-- GROUP RELATED: Identify failures with common causes
-- QUICK WINS: Highlight fast fixes for immediate progress
-- BE ACTIONABLE: Every suggestion should be immediately actionable
-- PROVIDE AUTO-FIX GUIDANCE: Include prompts for automated tools
+        Args:
+            failures: List of test failure data
+            metadata: Additional context about the test run
+            batch_size: Failures per LLM call (defaults to MAX_PROMPT_FAILURES)
+            max_concurrency: Maximum number of concurrent LLM calls
+
+        Returns:
+            Merged AIAnalysisResult, or None if every batch failed
+        """
+        return asyncio.run(
+            self.analyze_failures_batched_async(failures, metadata, batch_size, max_concurrency)
+        )
 
-Remember: Developers need to know WHAT to fix, in WHAT ORDER, HOW LONG it will take, and IF it can be automated.
-Respond with valid JSON only - no markdown formatting."""
+    @classmethod
+    def _batch_failures(
+        cls, failures: List[Dict[str, Any]], batch_size: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Split failures into batches, keeping failures with the same error together."""
+        # category -> error signature -> failures, so related errors share batches
+        groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for failure in cls._deduplicate_failures(cls._normalize_failures(failures)):
+            signature = failure["error_message"][:80]
+            category_groups = groups.setdefault(cls._error_category(failure), {})
+            category_groups.setdefault(signature, []).append(failure)
+
+        ordered = [
+            failure
+            for category_groups in groups.values()
+            for group in category_groups.values()
+            for failure in group
+        ]
+        return [ordered[i : i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+    def _merge_results(
+        self, weighted_results: List[Tuple[AIAnalysisResult, int]]
+    ) -> AIAnalysisResult:
+        """Merge per-batch analyses, weighting scores by batch size."""
+        if len(weighted_results) == 1:
+            return weighted_results[0][0]
+
+        results = [result for result, _ in weighted_results]
+
+        def weighted_average(attr: str) -> Optional[float]:
+            scored = [
+                (getattr(result, attr), weight)
+                for result, weight in weighted_results
+                if getattr(result, attr) is not None
+            ]
+            if not scored:
+                return None
+            total_weight = sum(weight for _, weight in scored)
+            return sum(value * weight for value, weight in scored) / total_weight
+
+        def unique(items: List[Any]) -> List[Any]:
+            merged: List[Any] = []
+            for item in items:
+                if item not in merged:
+                    merged.append(item)
+            return merged
+
+        def concat(attr: str) -> Optional[List[Any]]:
+            merged = [item for result in results for item in (getattr(result, attr) or [])]
+            return merged or None
+
+        def merge_dicts(attr: str) -> Optional[Dict[str, List[str]]]:
+            merged: Dict[str, List[str]] = {}
+            for result in results:
+                for key, values in (getattr(result, attr) or {}).items():
+                    merged.setdefault(key, []).extend(values)
+            return merged or None
+
+        return AIAnalysisResult(
+            summary=" ".join(result.summary for result in results),
+            root_cause_analysis="\n\n".join(result.root_cause_analysis for result in results),
+            suggested_actions=unique(
+                [action for result in results for action in result.suggested_actions]
+            ),
+            confidence_score=weighted_average("confidence_score") or 0.0,
+            analysis_model=self.model,
+            error_patterns=unique(
+                [pattern for result in results for pattern in result.error_patterns]
+            ),
+            priority_assessment=merge_dicts("priority_assessment"),
+            work_order=concat("work_order"),
+            specific_fixes=concat("specific_fixes"),
+            failure_categories=merge_dicts("failure_categories"),
+            quick_wins=concat("quick_wins"),
+            test_quality_feedback=concat("test_quality_feedback"),
+            fixability_score=weighted_average("fixability_score"),
+            model_tier=self.model_tier,
+            raw_confidence=weighted_average("raw_confidence"),
+            auto_fix_prompt="\n\n".join(
+                result.auto_fix_prompt for result in results if result.auto_fix_prompt
+            )
+            or None,
+        )
+
+    def analyze_failures_stream(
+        self, failures: List[Dict[str, Any]], metadata: Dict[str, Any]
+    ) -> Iterator[str]:
+        """
+        Stream raw analysis text for callers that want progressive output.
+
+        Args:
+            failures: List of test failure data
+            metadata: Additional context about the test run
+
+        Yields:
+            Response text fragments as they arrive from the LLM
+        """
+        if not failures:
+            return
+
+        yield from self._stream_completion(self._create_analysis_prompt(failures, metadata))
+
+    def analyze_failures_fields(
+        self, failures: List[Dict[str, Any]], metadata: Dict[str, Any]
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream analysis fields as soon as each one has been generated.
+
+        The summary and priority assessment come first in the response, so
+        callers can show them while the rest of the analysis is still arriving.
+
+        Args:
+            failures: List of test failure data
+            metadata: Additional context about the test run
+
+        Yields:
+            (field name, value) pairs from the response's JSON object, in order
+        """
+        if not failures:
+            return
+
+        reader = _JsonFieldReader()
+        for text in self._stream_completion(self._create_analysis_prompt(failures, metadata)):
+            yield from reader.feed(text)
+            if reader.done:
+                break
+
+    def _completion_kwargs(self, prompt: str, stream: bool = True) -> Dict[str, Any]:
+        """Build the LiteLLM completion arguments for a prompt."""
+        kwargs = {
+            "model": self.model,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": prompt},
+            ],
+            "max_tokens": self._response_token_limit(prompt),
+            "temperature": self.TEMPERATURE,
+            "timeout": self.request_timeout,
+            "num_retries": self.max_retries,
+            "response_format": self.RESPONSE_FORMAT,
+            "stream": stream,
+        }
+        if self.fallback_models:
+            kwargs["fallbacks"] = self.fallback_models
+        return kwargs
+
+    def _finish_analysis(
+        self, chunks: List[str], complete: bool, prompt_hash: str
+    ) -> AIAnalysisResult:
+        """Join streamed fragments, cache complete responses and parse them."""
+        analysis_text = "".join(chunks)
+        if complete:
+            self._store_response(prompt_hash, analysis_text)
+        return self._parse_analysis_response(analysis_text)
+
+    def _stream_completion(self, prompt: str, stream: bool = True) -> Iterator[str]:
+        """Call the LLM and yield content fragments (the whole text if not streaming)."""
+        import litellm
+
+        response = litellm.completion(**self._completion_kwargs(prompt, stream))
+        if not stream:
+            yield response.choices[0].message.content or ""
+            return
+
+        for chunk in response:
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
 
     def _create_analysis_prompt(
         self, failures: List[Dict[str, Any]], metadata: Dict[str, Any]
@@ -266,124 +1066,292 @@ Respond with valid JSON only - no markdown formatting."""
         """Create the analysis prompt with failure data."""
 
         # Limit the number of failures to analyze to avoid token limits
-        max_failures = 5
-        limited_failures = failures[:max_failures]
-
-        prompt_parts = [
-            "Please analyze the following Playwright test failures:\n",
-            "Test Run Context:",
-            f"- Total Tests: {metadata.get('total_tests', 'unknown')}",
-            f"- Failed Tests: {len(failures)}",
-            f"- Playwright Version: {metadata.get('playwright_version', 'unknown')}",
-            f"- Projects: {', '.join(metadata.get('projects', []))}",
-            f"- Workers: {metadata.get('workers', 'unknown')}\n",
-            "Failure Details:\n",
+        max_failures = self.MAX_PROMPT_FAILURES
+        unique_failures = self._deduplicate_failures(self._normalize_failures(failures))
+        clusters = self._cluster_failures(unique_failures)[:max_failures]
+        char_budget = max_failures * self.PROMPT_CHARS_PER_FAILURE
+        failure_chars = 0
+        included = 0
+        represented = 0
+
+        header = PROMPT_HEADER_TEMPLATE.format(
+            total_tests=metadata.get("total_tests", "unknown"),
+            failed_tests=len(failures),
+            playwright_version=metadata.get("playwright_version", "unknown"),
+            projects=", ".join(metadata.get("projects", [])),
+            workers=metadata.get("workers", "unknown"),
+        )
+        failure_blocks = [
+            self._format_prompt_failure(i, failure, count - 1)
+            for i, (failure, count) in enumerate(clusters, 1)
         ]
 
-        for i, failure in enumerate(limited_failures, 1):
-            # Extract key information from failure
-            test_name = failure.get("test_name", "Unknown Test")
-            file_path = failure.get("file_path", "unknown")
-            error_message = failure.get("error_message", "No error message")
-            stack_trace = failure.get("stack_trace", "")
-            duration = failure.get("duration", 0)
-            retry_count = failure.get("retry_count", 0)
-
-            # Truncate long stack traces
-            if len(stack_trace) > 500:
-                stack_trace = stack_trace[:500] + "... (truncated)"
-
-            prompt_parts.extend(
-                [
-                    f"\n{i}. Test: {test_name}",
-                    f"   File: {file_path}",
-                    f"   Duration: {duration}ms",
-                    f"   Retries: {retry_count}",
-                    f"   Error: {error_message}",
-                    f"   Stack Trace: {stack_trace}\n",
-                ]
-            )
+        # Stop adding failures once the prompt budget is spent
+        for failure_block, (_, count) in zip(failure_blocks, clusters):
+            failure_chars += len(failure_block)
+            if included and failure_chars > char_budget:
+                break
+            included += 1
+            represented += count
 
-        if len(failures) > max_failures:
-            prompt_parts.append(f"\n... and {len(failures) - max_failures} more similar failures")
+        prompt_parts = [header, *failure_blocks[:included]]
+        if len(unique_failures) > represented:
+            remaining = len(unique_failures) - represented
+            prompt_parts.append(f"\n... and {remaining} more similar failures")
 
         return "\n".join(prompt_parts)
 
+    def _format_prompt_failure(
+        self, index: int, failure: Dict[str, Any], similar_count: int = 0
+    ) -> str:
+        """Render one normalized failure for the prompt, clamping unbounded fields."""
+        test_name, file_path, error_message, stack_trace, duration, retry_count = (
+            get_prompt_failure_fields(failure)
+        )
+        template = PROMPT_CLUSTER_FAILURE_TEMPLATE if similar_count else PROMPT_FAILURE_TEMPLATE
+        return template.format(
+            index=index,
+            test_name=_truncate(test_name, self.MAX_TEST_NAME_CHARS),
+            file_path=_truncate(file_path, self.MAX_FILE_PATH_CHARS),
+            duration=duration,
+            retry_count=retry_count,
+            error_message=self._truncate_tokens(
+                error_message, self.MAX_ERROR_MESSAGE_CHARS, self.MAX_ERROR_MESSAGE_TOKENS
+            ),
+            stack_trace=self._truncate_tokens(
+                stack_trace, self.MAX_STACK_TRACE_CHARS, self.MAX_STACK_TRACE_TOKENS
+            ),
+            count=similar_count,
+        )
+
+    def _truncate_tokens(self, text: Any, max_chars: int, max_tokens: int) -> str:
+        """Truncate text to max_chars and, if the model is known, to max_tokens."""
+        text = str(text) if text is not None else ""
+        clamped = text[:max_chars]
+        if self._context_window:
+            import litellm
+
+            tokens = litellm.encode(model=self.model, text=clamped)
+            if len(tokens) > max_tokens:
+                clamped = litellm.decode(model=self.model, tokens=tokens[:max_tokens])
+
+        if len(clamped) < len(text):
+            return clamped + "... (truncated)"
+        return text
+
+    def _cluster_failures(self, failures: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], int]]:
+        """Group near-identical failures, returning (representative, count) pairs in order."""
+        clusters: List[List[Any]] = []  # [representative, fingerprint, count]
+        # Exact repeats (e.g. the same error from every shard) skip the SimHash
+        clusters_by_text: Dict[str, List[Any]] = {}
+        for failure in failures:
+            text = "{}\n{}".format(
+                failure["error_message"][: self.MAX_ERROR_MESSAGE_CHARS],
+                failure["stack_trace"][: self.MAX_STACK_TRACE_CHARS],
+            )
+            cluster = clusters_by_text.get(text)
+            if cluster is None:
+                fingerprint = self._simhash(text)
+                for cluster in clusters:
+                    if (cluster[1] ^ fingerprint).bit_count() <= self.SIMHASH_MAX_DISTANCE:
+                        break
+                else:
+                    cluster = [failure, fingerprint, 0]
+                    clusters.append(cluster)
+                clusters_by_text[text] = cluster
+            cluster[2] += 1
+        return [(failure, count) for failure, _, count in clusters]
+
+    @staticmethod
+    def _simhash(text: str) -> int:
+        """64-bit SimHash over character 3-grams, ignoring case and numbers."""
+        text = re.sub(r"\d+", "0", text.lower())
+        shingles = {text[i : i + 3] for i in range(max(len(text) - 2, 1))}
+        # Stable hashes (unlike hash()) keep prompts, and so cache keys, reproducible
+        digests = (hashlib.blake2b(s.encode(), digest_size=8).digest() for s in shingles)
+        bit_rows = [format(int.from_bytes(digest, "big"), "064b") for digest in digests]
+        # Set each bit that is 1 in the majority of shingle hashes
+        fingerprint = 0
+        for column in zip(*bit_rows):
+            fingerprint = (fingerprint << 1) | (column.count("1") * 2 > len(bit_rows))
+        return fingerprint
+
+    def _prompt_hash(self, prompt: str) -> str:
+        """Hash everything that determines the LLM response for a prompt."""
+        key_data = [
+            self.model,
+            self.max_tokens,
+            self.TEMPERATURE,
+            self.SYSTEM_PROMPT,
+            prompt,
+        ]
+        return hashlib.sha256(json.dumps(key_data).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def clear_response_cache(cls) -> None:
+        """Clear the in-process LLM response memo."""
+        cls._response_memo.clear()
+
+    def _get_cached_response(self, prompt_hash: str) -> Optional[str]:
+        """Look up a response in the in-process memo, then the disk cache."""
+        memo = self._response_memo
+        if prompt_hash in memo:
+            memo.move_to_end(prompt_hash)
+            return memo[prompt_hash]
+
+        response_text = read_cached_response(get_cache_path(prompt_hash), self.CACHE_TTL_SECONDS)
+        if response_text is not None:
+            self._remember_response(prompt_hash, response_text)
+        return response_text
+
+    def _store_response(self, prompt_hash: str, response_text: str) -> None:
+        """Store a complete response in the in-process memo and disk cache."""
+        if not response_text:
+            return
+        self._remember_response(prompt_hash, response_text)
+        write_cached_response(get_cache_path(prompt_hash), self.model, response_text)
+
+    def _remember_response(self, prompt_hash: str, response_text: str) -> None:
+        """Add a response to the bounded in-process memo."""
+        memo = self._response_memo
+        memo[prompt_hash] = response_text
+        memo.move_to_end(prompt_hash)
+        while len(memo) > self.RESPONSE_MEMO_SIZE:
+            memo.popitem(last=False)
+
+    @classmethod
+    def _error_category(cls, failure: Dict[str, Any]) -> str:
+        """Classify a normalized failure by the first known error signature in it."""
+        text = "{}\n{}".format(
+            failure["error_message"], failure["stack_trace"][: cls.MAX_STACK_TRACE_CHARS]
+        )
+        match = ERROR_CATEGORY_PATTERN.search(text)
+        return match.lastgroup if match else "other"
+
+    @staticmethod
+    def _normalize_failures(failures: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Validate failures once before prompt building and batching.
+
+        Missing fields get their prompt defaults, text fields are coerced to
+        str (None becomes ""), and entries that are not dicts are dropped.
+
+        Args:
+            failures: Failure data as produced by parse_report
+
+        Returns:
+            New failure dicts containing every PROMPT_FAILURE_DEFAULTS field
+        """
+        normalized = []
+        for failure in failures:
+            if not isinstance(failure, dict):
+                logger.warning(f"Skipping malformed failure entry: {type(failure).__name__}")
+                continue
+            failure = {**PROMPT_FAILURE_DEFAULTS, **failure}
+            for field in PROMPT_FAILURE_TEXT_FIELDS:
+                value = failure[field]
+                if not isinstance(value, str):
+                    failure[field] = "" if value is None else str(value)
+            normalized.append(failure)
+        return normalized
+
+    @staticmethod
+    def _deduplicate_failures(failures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop repeated normalized failures (e.g. retries) sharing a test name and error."""
+        seen = set()
+        unique_failures = []
+        for failure in failures:
+            key = (failure["test_name"], failure["error_message"][:200])
+            if key not in seen:
+                seen.add(key)
+                unique_failures.append(failure)
+        return unique_failures
+
     def _parse_analysis_response(self, response_text: str) -> AIAnalysisResult:
         """Parse the AI response into structured data."""
         try:
-            # Extract JSON from potential markdown code blocks
-            json_text = response_text.strip()
-
-            # Remove markdown code fences if present
-            if "```json" in json_text:
-                # Extract content between ```json and ```
-                start = json_text.find("```json") + 7
-                end = json_text.find("```", start)
-                if end > start:
-                    json_text = json_text[start:end].strip()
-            elif "```" in json_text:
-                # Generic code block
-                start = json_text.find("```") + 3
-                end = json_text.find("```", start)
-                if end > start:
-                    json_text = json_text[start:end].strip()
-
-            # Try to find JSON object boundaries
-            if "{" in json_text:
-                # Find first { and last }
-                start = json_text.find("{")
-                end = json_text.rfind("}")
-                if start >= 0 and end > start:
-                    json_text = json_text[start : end + 1]
-
-                    # Parse JSON
-                    data = json.loads(json_text)
-
-                    # Get raw confidence from AI response
-                    raw_confidence = float(data.get("confidence_score", 0.5))
-
-                    # Apply model-based confidence multiplier
-                    adjusted_confidence = min(raw_confidence * self.model_multiplier, 1.0)
-
-                    # Get fixability score
-                    fixability_score = float(data.get("fixability_score", 0.5))
-
-                    # Generate auto-fix prompt if not provided
-                    auto_fix_prompt = data.get("auto_fix_prompt") or self._generate_auto_fix_prompt(
-                        data
-                    )
-
-                    return AIAnalysisResult(
-                        summary=data.get("summary", "AI analysis completed"),
-                        root_cause_analysis=data.get(
-                            "root_cause_analysis", "No specific root cause identified"
-                        ),
-                        suggested_actions=data.get("suggested_actions", []),
-                        confidence_score=adjusted_confidence,
-                        analysis_model=self.model,
-                        error_patterns=data.get("error_patterns", []),
-                        # Enhanced fields
-                        priority_assessment=data.get("priority_assessment"),
-                        work_order=data.get("work_order"),
-                        specific_fixes=data.get("specific_fixes"),
-                        failure_categories=data.get("failure_categories"),
-                        quick_wins=data.get("quick_wins"),
-                        test_quality_feedback=data.get("test_quality_feedback"),
-                        # Auto-fix support fields
-                        fixability_score=fixability_score,
-                        model_tier=self.model_tier,
-                        raw_confidence=raw_confidence,
-                        auto_fix_prompt=auto_fix_prompt,
-                    )
-
-            # Fallback: parse as plain text
-            return self._parse_text_response(response_text)
+            data = extract_json_object(response_text)
+            if data is None:
+                # Fallback: parse as plain text
+                return self._parse_text_response(response_text)
+            data = self._drop_malformed_fields(data)
+
+            # Get raw confidence from AI response
+            raw_confidence = float(data.get("confidence_score", 0.5))
+
+            # Apply model-based confidence multiplier
+            adjusted_confidence = min(raw_confidence * self.model_multiplier, 1.0)
+
+            # Get fixability score
+            fixability_score = float(data.get("fixability_score", 0.5))
+
+            # Generate auto-fix prompt if not provided
+            auto_fix_prompt = data.get("auto_fix_prompt") or self._generate_auto_fix_prompt(data)
+
+            return AIAnalysisResult(
+                summary=data.get("summary", "AI analysis completed"),
+                root_cause_analysis=data.get(
+                    "root_cause_analysis", "No specific root cause identified"
+                ),
+                suggested_actions=data.get("suggested_actions", []),
+                confidence_score=adjusted_confidence,
+                analysis_model=self.model,
+                error_patterns=data.get("error_patterns", []),
+                # Enhanced fields
+                priority_assessment=data.get("priority_assessment"),
+                work_order=data.get("work_order"),
+                specific_fixes=data.get("specific_fixes"),
+                failure_categories=data.get("failure_categories"),
+                quick_wins=data.get("quick_wins"),
+                test_quality_feedback=data.get("test_quality_feedback"),
+                # Auto-fix support fields
+                fixability_score=fixability_score,
+                model_tier=self.model_tier,
+                raw_confidence=raw_confidence,
+                auto_fix_prompt=auto_fix_prompt,
+            )
 
         except (json.JSONDecodeError, ValueError) as e:
             self.logger.warning(f"Failed to parse JSON response: {e}")
             return self._parse_text_response(response_text)
 
+    def _drop_malformed_fields(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Remove fields whose JSON type doesn't match ANALYSIS_FIELD_TYPES."""
+        malformed = [
+            field
+            for field, (expected_type, item_type) in ANALYSIS_FIELD_TYPES.items()
+            if data.get(field) is not None
+            and (
+                not isinstance(data[field], expected_type)
+                or (item_type and not all(isinstance(item, item_type) for item in data[field]))
+            )
+        ]
+        malformed.extend(
+            field
+            for field in NUMERIC_ANALYSIS_FIELDS
+            if field in data and not _is_number(data[field])
+        )
+        if malformed:
+            self.logger.warning(f"Ignoring malformed AI response fields: {', '.join(malformed)}")
+            data = {field: value for field, value in data.items() if field not in malformed}
+
+        # Per-fix scores are compared against thresholds, so drop non-numeric ones too
+        fixes = data.get("specific_fixes")
+        if fixes and not all(_is_number(fix.get("fixability_score", 0)) for fix in fixes):
+            self.logger.warning("Ignoring malformed fixability_score in specific_fixes")
+            data = {
+                **data,
+                "specific_fixes": [
+                    (
+                        fix
+                        if _is_number(fix.get("fixability_score", 0))
+                        else {key: value for key, value in fix.items() if key != "fixability_score"}
+                    )
+                    for fix in fixes
+                ],
+            }
+        return data
+
     def _generate_auto_fix_prompt(self, data: Dict[str, Any]) -> str:
         """Generate auto-fix prompt from analysis data."""
         prompt_parts = []
@@ -392,16 +1360,17 @@ Respond with valid JSON only - no markdown formatting."""
         if data.get("summary"):
             prompt_parts.append(f"Summary: {data['summary']}")
 
-        # Add specific fixes with highest fixability
-        specific_fixes = data.get("specific_fixes", [])
-        if specific_fixes:
-            high_fixability = [f for f in specific_fixes if f.get("fixability_score", 0) >= 0.7]
-            if high_fixability:
+        # Add specific fixes with highest fixability, in one pass
+        header_written = False
+        for fix in data.get("specific_fixes") or ():
+            if fix.get("fixability_score", 0) < 0.7:
+                continue
+            if not header_written:
                 prompt_parts.append("\nAuto-fixable issues:")
-                for fix in high_fixability:
-                    prompt_parts.append(f"- {fix.get('test')}: {fix.get('fix')}")
-                    if fix.get("code_hint"):
-                        prompt_parts.append(f"  Code: {fix['code_hint']}")
+                header_written = True
+            prompt_parts.append(f"- {fix.get('test')}: {fix.get('fix')}")
+            if fix.get("code_hint"):
+                prompt_parts.append(f"  Code: {fix['code_hint']}")
 
         # Add error patterns
         if data.get("error_patterns"):
@@ -411,168 +1380,160 @@ Respond with valid JSON only - no markdown formatting."""
 
     def _parse_text_response(self, response_text: str) -> AIAnalysisResult:
         """Parse plain text response as fallback."""
-        lines = response_text.strip().split("\n")
-
         # Extract summary (first non-empty line)
-        summary = next((line.strip() for line in lines if line.strip()), "AI analysis completed")
-
-        # Look for action items or suggestions
-        suggested_actions = []
-        for line in lines:
-            line = line.strip()
-            if (
-                line.startswith("- ")
-                or line.startswith("* ")
-                or line.startswith("1.")
-                or line.startswith("2.")
-            ):
-                suggested_actions.append(line.lstrip("- *123456789. "))
+        first_line = FIRST_LINE_PATTERN.search(response_text)
+        summary = first_line.group().strip() if first_line else "AI analysis completed"
+
+        # Look for action items or suggestions (limited to 5), stopping at the fifth
+        bullet_matches = BULLET_PATTERN.finditer(response_text)
+        suggested_actions = [match.group(1) for match in itertools.islice(bullet_matches, 5)]
 
         return AIAnalysisResult(
             summary=summary[:200],  # Limit summary length
             root_cause_analysis=response_text[:500],  # Limit analysis length
-            suggested_actions=suggested_actions[:5],  # Limit to 5 actions
+            suggested_actions=suggested_actions,
             confidence_score=0.7,  # Default confidence for text parsing
             analysis_model=self.model,
             error_patterns=[],
         )
 
 
+def _render_priority_assessment(priorities: Dict[str, List[str]]) -> str:
+    """Render failures grouped by priority level."""
+    return _markdown_section(
+        "🎯 Priority Assessment",
+        [
+            f"**{label}**: {', '.join(priorities[level])}"
+            for level, label in PRIORITY_LABELS
+            if priorities.get(level)
+        ],
+    )
+
+
+def _render_work_order(steps: List[str]) -> str:
+    """Render the recommended fix order as a numbered list."""
+    return _markdown_section(
+        "📋 Recommended Work Order", [f"{i}. {step}" for i, step in enumerate(steps, 1)]
+    )
+
+
+def _render_quick_wins(wins: List[str]) -> str:
+    """Render fixes that take under ten minutes."""
+    return _markdown_section("⚡ Quick Wins (< 10 minutes)", [f"- {win}" for win in wins])
+
+
+def _render_specific_fixes(fixes: List[Dict[str, Any]]) -> str:
+    """Render per-test fix recommendations, one block per test."""
+    blocks = [
+        SPECIFIC_FIX_TEMPLATE.format(
+            test=fix.get("test", "Unknown"),
+            issue=fix.get("issue", "N/A"),
+            fix=fix.get("fix", "N/A"),
+            code_hint=(
+                f"- **Code suggestion**: `{fix['code_hint']}`\n" if fix.get("code_hint") else ""
+            ),
+            estimated_time=fix.get("estimated_time", "Unknown"),
+            complexity=fix.get("complexity", "unknown"),
+        )
+        for fix in fixes
+    ]
+    return _markdown_section("🔧 Specific Fix Recommendations", blocks, "\n\n")
+
+
+def _render_failure_categories(categories: Dict[str, List[str]]) -> str:
+    """Render failures grouped by category."""
+    return _markdown_section(
+        "📊 Failure Categories",
+        [
+            f"**{label}**: {', '.join(categories[category])}"
+            for category, label in FAILURE_CATEGORY_LABELS
+            if categories.get(category)
+        ],
+    )
+
+
+def _render_root_cause(root_cause: str) -> str:
+    """Render the root cause analysis (always shown)."""
+    return f"### 🔍 Root Cause Analysis\n{root_cause}\n"
+
+
+def _render_suggested_actions(actions: List[str]) -> str:
+    """Render the action items as a numbered list."""
+    return _markdown_section(
+        "✅ Action Items", [f"{i}. {action}" for i, action in enumerate(actions, 1)]
+    )
+
+
+def _render_test_quality_feedback(feedback: List[Dict[str, Any]]) -> str:
+    """Render test quality feedback, one block per issue."""
+    blocks = [
+        TEST_QUALITY_TEMPLATE.format(
+            issue=item.get("issue", "N/A"),
+            recommendation=item.get("recommendation", "N/A"),
+            benefit=item.get("benefit", "N/A"),
+        )
+        for item in feedback
+    ]
+    return _markdown_section("💡 Test Quality Improvements", blocks, "\n\n")
+
+
+def _render_error_patterns(patterns: List[str]) -> str:
+    """Render the identified error patterns."""
+    return _markdown_section("🔎 Error Patterns Identified", [f"- {p}" for p in patterns])
+
+
+def _render_analysis_footer(analysis: AIAnalysisResult) -> str:
+    """Render the model, confidence and fixability footer."""
+    tier = f" ({analysis.model_tier} tier)" if analysis.model_tier else ""
+    raw = (
+        f" (raw: {analysis.raw_confidence:.1%})"
+        if analysis.raw_confidence and analysis.raw_confidence != analysis.confidence_score
+        else ""
+    )
+    fixability = ""
+    if analysis.fixability_score is not None:
+        score = analysis.fixability_score
+        emoji = "🟢" if score >= 0.7 else "🟡" if score >= 0.5 else "🔴"
+        fixability = FIXABILITY_TEMPLATE.format(emoji=emoji, score=score)
+    return ANALYSIS_FOOTER_TEMPLATE.format(
+        model=analysis.analysis_model,
+        tier=tier,
+        confidence=analysis.confidence_score,
+        raw=raw,
+        fixability=fixability,
+    )
+
+
 class AIAnalysisFormatter:
     """Formats AI analysis results for inclusion in GitHub issues."""
 
+    # (result field, section renderer, render even when the field is empty),
+    # in issue order. New optional sections only need an entry here.
+    SECTION_RENDERERS = (
+        ("priority_assessment", _render_priority_assessment, False),
+        ("work_order", _render_work_order, False),
+        ("quick_wins", _render_quick_wins, False),
+        ("specific_fixes", _render_specific_fixes, False),
+        ("failure_categories", _render_failure_categories, False),
+        ("root_cause_analysis", _render_root_cause, True),
+        ("suggested_actions", _render_suggested_actions, False),
+        ("test_quality_feedback", _render_test_quality_feedback, False),
+        ("error_patterns", _render_error_patterns, False),
+    )
+
     @staticmethod
     def format_analysis_section(analysis: AIAnalysisResult) -> str:
         """Format AI analysis for GitHub issue."""
         if not analysis:
             return ""
 
-        sections = [
-            "## 🤖 AI-Powered Analysis & Recommendations",
-            "",
-            f"**Summary**: {analysis.summary}",
-            "",
-        ]
-
-        # Priority Assessment
-        if analysis.priority_assessment:
-            sections.extend(["### 🎯 Priority Assessment", ""])
-            priority_emojis = {
-                "critical": "🔴",
-                "high": "🟠",
-                "medium": "🟡",
-                "low": "🟢",
-            }
-            for level in ["critical", "high", "medium", "low"]:
-                failures = analysis.priority_assessment.get(level, [])
-                if failures:
-                    emoji = priority_emojis.get(level, "⚪")
-                    sections.append(f"**{emoji} {level.title()}**: {', '.join(failures)}")
-            sections.append("")
-
-        # Work Order
-        if analysis.work_order:
-            sections.extend(["### 📋 Recommended Work Order", ""])
-            for i, step in enumerate(analysis.work_order, 1):
-                sections.append(f"{i}. {step}")
-            sections.append("")
-
-        # Quick Wins
-        if analysis.quick_wins:
-            sections.extend(["### ⚡ Quick Wins (< 10 minutes)", ""])
-            for win in analysis.quick_wins:
-                sections.append(f"- {win}")
-            sections.append("")
-
-        # Specific Fixes
-        if analysis.specific_fixes:
-            sections.extend(["### 🔧 Specific Fix Recommendations", ""])
-            for fix in analysis.specific_fixes:
-                sections.append(f"**{fix.get('test', 'Unknown')}**")
-                sections.append(f"- **Issue**: {fix.get('issue', 'N/A')}")
-                sections.append(f"- **Fix**: {fix.get('fix', 'N/A')}")
-                if fix.get("code_hint"):
-                    sections.append(f"- **Code suggestion**: `{fix['code_hint']}`")
-                sections.append(
-                    f"- **Effort**: {fix.get('estimated_time', 'Unknown')} "
-                    f"({fix.get('complexity', 'unknown')} complexity)"
-                )
-                sections.append("")
-
-        # Failure Categories
-        if analysis.failure_categories:
-            sections.extend(["### 📊 Failure Categories", ""])
-            category_labels = {
-                "test_code_issues": "🧪 Test Code Issues",
-                "application_bugs": "🐛 Application Bugs",
-                "infrastructure": "🏗️ Infrastructure",
-                "flaky_tests": "🎲 Flaky Tests",
-            }
-            for category, label in category_labels.items():
-                issues = analysis.failure_categories.get(category, [])
-                if issues:
-                    sections.append(f"**{label}**: {', '.join(issues)}")
-            sections.append("")
-
-        # Root Cause
-        sections.extend(["### 🔍 Root Cause Analysis", analysis.root_cause_analysis, ""])
-
-        # Suggested Actions
-        if analysis.suggested_actions:
-            sections.extend(["### ✅ Action Items", ""])
-            for i, action in enumerate(analysis.suggested_actions, 1):
-                sections.append(f"{i}. {action}")
-            sections.append("")
-
-        # Test Quality Feedback
-        if analysis.test_quality_feedback:
-            sections.extend(["### 💡 Test Quality Improvements", ""])
-            for feedback in analysis.test_quality_feedback:
-                sections.append(f"**Issue**: {feedback.get('issue', 'N/A')}")
-                sections.append(f"**Recommendation**: {feedback.get('recommendation', 'N/A')}")
-                sections.append(f"**Benefit**: {feedback.get('benefit', 'N/A')}")
-                sections.append("")
-
-        # Error Patterns
-        if analysis.error_patterns:
-            sections.extend(["### 🔎 Error Patterns Identified", ""])
-            for pattern in analysis.error_patterns:
-                sections.append(f"- {pattern}")
-            sections.append("")
-
-        # Metadata
-        metadata_parts = ["---"]
-
-        # Model information with tier
-        model_info = f"*Analysis generated by {analysis.analysis_model}"
-        if analysis.model_tier:
-            model_info += f" ({analysis.model_tier} tier)"
-        model_info += f" - Confidence: {analysis.confidence_score:.1%}"
-        if analysis.raw_confidence and analysis.raw_confidence != analysis.confidence_score:
-            model_info += f" (raw: {analysis.raw_confidence:.1%})"
-        model_info += "*"
-        metadata_parts.append(model_info)
-
-        # Fixability score
-        if analysis.fixability_score is not None:
-            fixability_emoji = (
-                "🟢"
-                if analysis.fixability_score >= 0.7
-                else "🟡" if analysis.fixability_score >= 0.5 else "🔴"
-            )
-            metadata_parts.append(
-                f"*{fixability_emoji} Auto-fix feasibility: {analysis.fixability_score:.1%}*"
-            )
-
-        metadata_parts.extend(
-            [
-                "",
-                "💬 **Need help?** Comment on this issue with questions about the analysis.",
-            ]
-        )
-
-        sections.extend(metadata_parts)
+        sections = [ANALYSIS_HEADER_TEMPLATE.format(summary=analysis.summary)]
+        for field, render, always in AIAnalysisFormatter.SECTION_RENDERERS:
+            value = getattr(analysis, field)
+            if value or always:
+                sections.append(render(value))
 
+        sections.append(_render_analysis_footer(analysis))
         return "\n".join(sections)
 
     @staticmethod
@@ -600,28 +1561,45 @@ def create_ai_analyzer(model: str = None) -> Optional[AIAnalyzer]:
     Returns:
         AIAnalyzer instance or None if not configured
     """
-    # Check if AI analysis is enabled and configured
-    # OpenRouter, DeepSeek, and other providers supported via LiteLLM
-    has_key = (
-        os.getenv("OPENAI_API_KEY")
-        or os.getenv("ANTHROPIC_API_KEY")
-        or os.getenv("OPENROUTER_API_KEY")
-        or os.getenv("DEEPSEEK_API_KEY")
-    )
-    if not has_key:
+    # Check if AI analysis is enabled and configured. Empty values count as
+    # unset, since workflows often pass missing secrets through as "".
+    if not any(os.environ.get(key) for key in PROVIDER_API_KEYS):
         return None
 
     # Use provided model or default
     if not model:
         model = os.getenv("AI_MODEL", "gpt-4o-mini")
 
+    # A short timeout with retries beats waiting out a stalled provider
+    request_timeout = None
+    if os.getenv("AI_REQUEST_TIMEOUT"):
+        try:
+            request_timeout = float(os.environ["AI_REQUEST_TIMEOUT"])
+        except ValueError:
+            logging.warning(
+                f"Ignoring invalid AI_REQUEST_TIMEOUT: {os.environ['AI_REQUEST_TIMEOUT']!r}"
+            )
+
+    # Models tried in turn when the primary one keeps failing
+    fallback_models = tuple(parse_comma_separated(os.getenv("AI_FALLBACK_MODEL", "")))
+
     try:
-        return AIAnalyzer(model=model)
+        return _cached_analyzer(model, request_timeout, fallback_models)
     except Exception as e:
         logging.warning(f"Failed to create AI analyzer: {e}")
         return None
 
 
+@functools.lru_cache(maxsize=8)
+def _cached_analyzer(
+    model: str, request_timeout: Optional[float] = None, fallback_models: Tuple[str, ...] = ()
+) -> AIAnalyzer:
+    """Return one shared analyzer per configuration, so repeat calls skip setup."""
+    return AIAnalyzer(
+        model=model, request_timeout=request_timeout, fallback_models=list(fallback_models)
+    )
+
+
 def analyze_failures_with_ai(
     failures: List[Dict[str, Any]], metadata: Dict[str, Any], enabled: bool = True
 ) -> Optional[AIAnalysisResult]:
@@ -643,4 +1621,106 @@ def analyze_failures_with_ai(
     if not analyzer:
         return None
 
+    # More failures than fit in one prompt are analyzed in concurrent batches.
+    # asyncio.run cannot be nested, so callers already inside an event loop get
+    # the single-prompt analysis (or can await aanalyze_many themselves).
+    if len(failures) > analyzer.MAX_PROMPT_FAILURES and not _event_loop_running():
+        return analyzer.analyze_failures_parallel(failures, metadata)
+
     return analyzer.analyze_failures(failures, metadata)
+
+
+async def aanalyze_many(
+    jobs: List[Tuple[List[Dict[str, Any]], Dict[str, Any]]],
+    analyzer: Optional[AIAnalyzer] = None,
+    max_concurrency: int = 4,
+) -> List[Optional[AIAnalysisResult]]:
+    """
+    Analyze several independent failure sets (e.g. per project or shard) concurrently.
+
+    Args:
+        jobs: (failures, metadata) pairs, one per analysis
+        analyzer: Analyzer to use (defaults to create_ai_analyzer())
+        max_concurrency: Maximum number of concurrent LLM calls
+
+    Returns:
+        One AIAnalysisResult or None per job, in job order
+    """
+    analyzer = analyzer or create_ai_analyzer()
+    if not analyzer:
+        return [None] * len(jobs)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(
+        *(analyzer.analyze_failures_async(f, m, semaphore) for f, m in jobs),
+        return_exceptions=True,
+    )
+    return [None if isinstance(result, BaseException) else result for result in results]
+
+
+async def aanalyze_models(
+    models: List[str],
+    failures: List[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    max_concurrency: int = 4,
+) -> Dict[str, Optional[AIAnalysisResult]]:
+    """
+    Analyze the same failures with several models concurrently.
+
+    Useful for checking a budget model's analysis against a premium one
+    without paying for the calls one after another.
+
+    Args:
+        models: LiteLLM model names to compare
+        failures: List of test failure data
+        metadata: Additional context about the test run
+        max_concurrency: Maximum number of concurrent LLM calls
+
+    Returns:
+        AIAnalysisResult or None per model, keyed by model name
+    """
+    analyzers = {model: create_ai_analyzer(model) for model in models}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def analyze(analyzer: Optional[AIAnalyzer]) -> Optional[AIAnalysisResult]:
+        if analyzer is None:
+            return None
+        return await analyzer.analyze_failures_async(failures, metadata, semaphore)
+
+    results = await asyncio.gather(
+        *(analyze(analyzer) for analyzer in analyzers.values()), return_exceptions=True
+    )
+    return {
+        model: None if isinstance(result, BaseException) else result
+        for model, result in zip(analyzers, results)
+    }
+
+
+def analyze_failures_multimodel(
+    models: List[str],
+    failures: List[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    max_concurrency: int = 4,
+) -> Dict[str, Optional[AIAnalysisResult]]:
+    """
+    Synchronous wrapper around aanalyze_models.
+
+    Args:
+        models: LiteLLM model names to compare
+        failures: List of test failure data
+        metadata: Additional context about the test run
+        max_concurrency: Maximum number of concurrent LLM calls
+
+    Returns:
+        AIAnalysisResult or None per model, keyed by model name
+    """
+    return asyncio.run(aanalyze_models(models, failures, metadata, max_concurrency))
+
+
+def _event_loop_running() -> bool:
+    """Return True when called from inside a running asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
@@ -5,21 +5,31 @@ Auto-Fix Module
 Generates suggested fixes for test failures and can create branches or PRs.
 """
 
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
 import json
 import logging
 import subprocess  # nosec B404
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
-try:
-    import litellm
+from ai_analysis import (
+    AIAnalyzer,
+    _JsonObjectTracker,
+    extract_json_object,
+    get_cache_path,
+    read_cached_response,
+    write_cached_response,
+)
 
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
+# LiteLLM is imported only when a fix is actually generated (see ai_analysis)
+AI_AVAILABLE = importlib.util.find_spec("litellm") is not None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FixSuggestion:
     """Represents a suggested fix for a test failure."""
 
@@ -35,74 +45,57 @@ class FixSuggestion:
 class AutoFixGenerator:
     """Generates code fixes for test failures using AI."""
 
+    # Failure context and expected response shared by every fix prompt; JSON mode
+    # (response_format) enforces the syntax, so the schema is a single line
+    FIX_CONTEXT = (
+        "File: {file_path}\nLine: {line_number}\nError: {error_message}\n"
+        'Schema: {{"original_code": str, "suggested_code": str, '
+        '"reasoning": str, "confidence": float}}'
+    )
+
     # Pattern-specific fix prompts
     FIX_PROMPTS = {
-        "missing_await": """Fix missing await in async Playwright test.
-
-File: {file_path}
-Line: {line_number}
-Error: {error_message}
-
-Task: Add missing 'await' keyword before the async operation.
-
-Return ONLY valid JSON:
-{{
-  "original_code": "const response = page.goto(url)",
-  "suggested_code": "const response = await page.goto(url)",
-  "reasoning": "Added missing await for async operation",
-  "confidence": 0.95
-}}""",
-        "selector_timeout": """Fix selector timeout in Playwright test.
-
-File: {file_path}
-Line: {line_number}
-Error: {error_message}
-
-Task: Fix the selector or add appropriate timeout.
-
-Return ONLY valid JSON:
-{{
-  "original_code": "await page.click('.button')",
-  "suggested_code": "await page.click('.button', {{ timeout: 30000 }})",
-  "reasoning": "Added explicit timeout to prevent timeout errors",
-  "confidence": 0.85
-}}""",
-        "navigation_timeout": """Fix navigation timeout in Playwright test.
-
-File: {file_path}
-Line: {line_number}
-Error: {error_message}
-
-Task: Add or increase timeout for page navigation.
-
-Return ONLY valid JSON:
-{{
-  "original_code": "await page.goto(url)",
-  "suggested_code": "await page.goto(url, {{ timeout: 60000, waitUntil: 'networkidle' }})",
-  "reasoning": "Increased timeout and wait for network idle",
-  "confidence": 0.80
-}}""",
-        "type_mismatch": """Fix TypeScript type mismatch in Playwright test.
-
-File: {file_path}
-Line: {line_number}
-Error: {error_message}
-
-Task: Fix the type annotation or convert the value.
-
-Return ONLY valid JSON:
-{{
-  "original_code": "const count: string = await page.locator('.items').count()",
-  "suggested_code": "const count: number = await page.locator('.items').count()",
-  "reasoning": "Changed type from string to number to match count() return type",
-  "confidence": 0.90
-}}""",
+        "missing_await": (
+            "Fix missing await in async Playwright test: "
+            "add 'await' before the async operation.\n" + FIX_CONTEXT
+        ),
+        "selector_timeout": (
+            "Fix selector timeout in Playwright test: "
+            "fix the selector or add an appropriate timeout.\n" + FIX_CONTEXT
+        ),
+        "navigation_timeout": (
+            "Fix navigation timeout in Playwright test: "
+            "add or increase the timeout for page navigation.\n" + FIX_CONTEXT
+        ),
+        "type_mismatch": (
+            "Fix TypeScript type mismatch in Playwright test: "
+            "fix the type annotation or convert the value.\n" + FIX_CONTEXT
+        ),
     }
 
-    def __init__(self, model: str = "gpt-4o-mini"):
-        """Initialize the auto-fix generator."""
+    # Each prompt's bound format_map, called with the failure fields as one dict
+    FIX_PROMPT_FORMATTERS = {pattern: prompt.format_map for pattern, prompt in FIX_PROMPTS.items()}
+
+    # Patterns that need more reasoning than the default fix model reliably gives
+    ESCALATED_PATTERNS = frozenset({"selector_timeout", "navigation_timeout"})
+
+    # Fixes below this confidence are retried with the escalation model
+    MIN_FIX_CONFIDENCE = 0.6
+
+    def __init__(self, model: str = "gpt-4o-mini", escalation_model: Optional[str] = None):
+        """
+        Initialize the auto-fix generator.
+
+        Args:
+            model: Model used for fix generation
+            escalation_model: Optional stronger model for ESCALATED_PATTERNS and
+                for retrying fixes that fail to parse or have low confidence
+        """
         self.model = model
+        self.escalation_model = escalation_model if escalation_model != model else None
         self.logger = logging.getLogger(__name__)
+        # Fix responses by cache key, so repeated failures in a run share one call
+        self._fix_memo: Dict[str, str] = {}
 
     def generate_fix(
         self, failure: Dict[str, Any], file_content: Optional[str] = None
@@ -125,83 +118,267 @@ Return ONLY valid JSON:
             pattern = failure.get("suggested_pattern", "unknown_pattern")
             prompt = self._build_fix_prompt(failure, pattern, file_content)
 
-            # Call AI to generate fix
-            response = litellm.completion(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a Playwright test fixing expert. Return ONLY valid JSON.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,  # Low temperature for deterministic fixes
-                max_tokens=500,
-                timeout=20,
-            )
-
-            fix_data = self._parse_fix_response(response.choices[0].message.content)
-
-            if fix_data:
-                return FixSuggestion(
-                    file_path=failure["file_path"],
-                    line_number=failure.get("line_number"),
-                    original_code=fix_data["original_code"],
-                    suggested_code=fix_data["suggested_code"],
-                    reasoning=fix_data["reasoning"],
-                    confidence=float(fix_data.get("confidence", 0.7)),
-                    pattern=pattern,
+            model = self._model_for_pattern(pattern)
+            suggestion = self._request_fix(failure, pattern, prompt, model)
+            if self._should_escalate(suggestion, model):
+                suggestion = (
+                    self._request_fix(failure, pattern, prompt, self.escalation_model) or suggestion
                 )
+            return suggestion
 
+        except Exception as e:
+            self.logger.warning(f"Failed to generate fix: {e}")
             return None
 
+    def _request_fix(
+        self, failure: Dict[str, Any], pattern: str, prompt: str, model: str
+    ) -> Optional[FixSuggestion]:
+        """Get one fix from the given model, or from the cache."""
+        import litellm
+
+        fix_key = self._fix_key(failure, pattern, model)
+        cached = self._get_cached_fix(fix_key)
+        if cached is not None:
+            return self._build_suggestion(failure, pattern, cached)
+
+        # Stream the fix and stop reading once its JSON object is complete
+        response = litellm.completion(**self._completion_kwargs(prompt, model))
+        chunks = []
+        tracker = _JsonObjectTracker()
+        for chunk in response:
+            text = chunk.choices[0].delta.content
+            if text:
+                chunks.append(text)
+                if tracker.feed(text):
+                    break
+
+        return self._finish_fix(failure, pattern, fix_key, model, "".join(chunks))
+
+    async def agenerate_fix(
+        self,
+        failure: Dict[str, Any],
+        file_content: Optional[str] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Optional[FixSuggestion]:
+        """
+        Generate a fix suggestion for a test failure with an async LLM call.
+
+        Args:
+            failure: Failure data from structured JSON
+            file_content: Optional full file content for context
+            semaphore: Optional asyncio.Semaphore bounding concurrent LLM calls
+
+        Returns:
+            FixSuggestion if successful, None otherwise
+        """
+        if not AI_AVAILABLE:
+            self.logger.warning("AI not available for fix generation")
+            return None
+
+        try:
+            pattern = failure.get("suggested_pattern", "unknown_pattern")
+            prompt = self._build_fix_prompt(failure, pattern, file_content)
+
+            model = self._model_for_pattern(pattern)
+            suggestion = await self._arequest_fix(failure, pattern, prompt, model, semaphore)
+            if self._should_escalate(suggestion, model):
+                suggestion = (
+                    await self._arequest_fix(
+                        failure, pattern, prompt, self.escalation_model, semaphore
+                    )
+                    or suggestion
+                )
+            return suggestion
+
         except Exception as e:
             self.logger.warning(f"Failed to generate fix: {e}")
             return None
 
+    async def _arequest_fix(
+        self,
+        failure: Dict[str, Any],
+        pattern: str,
+        prompt: str,
+        model: str,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Optional[FixSuggestion]:
+        """Get one fix from the given model with an async call, or from the cache."""
+        import litellm
+
+        fix_key = self._fix_key(failure, pattern, model)
+        cached = self._get_cached_fix(fix_key)
+        if cached is not None:
+            return self._build_suggestion(failure, pattern, cached)
+
+        async with semaphore or contextlib.nullcontext():
+            response = await litellm.acompletion(**self._completion_kwargs(prompt, model))
+            chunks = []
+            tracker = _JsonObjectTracker()
+            async for chunk in response:
+                text = chunk.choices[0].delta.content
+                if text:
+                    chunks.append(text)
+                    if tracker.feed(text):
+                        break
+
+        return self._finish_fix(failure, pattern, fix_key, model, "".join(chunks))
+
+    async def agenerate_fixes(
+        self, failures: List[Dict[str, Any]], max_concurrency: int = 4
+    ) -> List[Optional[FixSuggestion]]:
+        """
+        Generate fix suggestions for several failures concurrently.
+
+        Args:
+            failures: Failure data from structured JSON
+            max_concurrency: Maximum number of concurrent LLM calls
+
+        Returns:
+            One FixSuggestion or None per failure, in failure order
+        """
+        # Failures that would send the same prompt share one LLM call
+        keys = []
+        for failure in failures:
+            pattern = failure.get("suggested_pattern", "unknown_pattern")
+            keys.append(self._fix_key(failure, pattern, self._model_for_pattern(pattern)))
+        unique_failures: Dict[str, Dict[str, Any]] = {}
+        for key, failure in zip(keys, failures):
+            unique_failures.setdefault(key, failure)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        fixes = await asyncio.gather(
+            *(
+                self.agenerate_fix(failure, semaphore=semaphore)
+                for failure in unique_failures.values()
+            )
+        )
+        fixes_by_key = dict(zip(unique_failures, fixes))
+        return [fixes_by_key[key] for key in keys]
+
+    def generate_fixes(
+        self, failures: List[Dict[str, Any]], max_concurrency: int = 4
+    ) -> List[Optional[FixSuggestion]]:
+        """
+        Synchronous wrapper around agenerate_fixes.
+
+        Args:
+            failures: Failure data from structured JSON
+            max_concurrency: Maximum number of concurrent LLM calls
+
+        Returns:
+            One FixSuggestion or None per failure, in failure order
+        """
+        return asyncio.run(self.agenerate_fixes(failures, max_concurrency))
+
+    def _model_for_pattern(self, pattern: str) -> str:
+        """Pick the model to ask first for a fix of the given pattern."""
+        if self.escalation_model and pattern in self.ESCALATED_PATTERNS:
+            return self.escalation_model
+        return self.model
+
+    def _should_escalate(self, suggestion: Optional[FixSuggestion], model: str) -> bool:
+        """Whether a fix should be retried once with the escalation model."""
+        if not self.escalation_model or model == self.escalation_model:
+            return False
+        return suggestion is None or suggestion.confidence < self.MIN_FIX_CONFIDENCE
+
+    def _completion_kwargs(self, prompt: str, model: str) -> Dict[str, Any]:
+        """Build the streamed LiteLLM completion arguments for a fix prompt."""
+        return {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a Playwright test fixing expert. Return ONLY valid JSON.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.2,  # Low temperature for deterministic fixes
+            "max_tokens": 250,
+            "timeout": 20,
+            "response_format": AIAnalyzer.RESPONSE_FORMAT,
+            "stream": True,
+        }
+
+    def _fix_key(self, failure: Dict[str, Any], pattern: str, model: str) -> str:
+        """Hash the inputs that determine the fix prompt and response."""
+        key_data = [
+            model,
+            pattern,
+            failure.get("file_path"),
+            failure.get("line_number"),
+            failure.get("error_message"),
+        ]
+        return "fix-" + hashlib.sha256(json.dumps(key_data, default=str).encode()).hexdigest()
+
+    def _get_cached_fix(self, fix_key: str) -> Optional[str]:
+        """Look up a fix response from this run, then from AI_CACHE_DIR."""
+        if fix_key in self._fix_memo:
+            return self._fix_memo[fix_key]
+
+        response_text = read_cached_response(get_cache_path(fix_key), AIAnalyzer.CACHE_TTL_SECONDS)
+        if response_text is not None:
+            self._fix_memo[fix_key] = response_text
+        return response_text
+
+    def _finish_fix(
+        self,
+        failure: Dict[str, Any],
+        pattern: str,
+        fix_key: str,
+        model: str,
+        response_text: str,
+    ) -> Optional[FixSuggestion]:
+        """Build the suggestion and cache the response if it yielded a fix."""
+        suggestion = self._build_suggestion(failure, pattern, response_text)
+        if suggestion:
+            self._fix_memo[fix_key] = response_text
+            write_cached_response(get_cache_path(fix_key), model, response_text)
+        return suggestion
+
+    def _build_suggestion(
+        self, failure: Dict[str, Any], pattern: str, response_text: str
+    ) -> Optional[FixSuggestion]:
+        """Turn the model's fix response into a FixSuggestion, if it parses."""
+        fix_data = self._parse_fix_response(response_text)
+
+        if fix_data:
+            return FixSuggestion(
+                file_path=failure["file_path"],
+                line_number=failure.get("line_number"),
+                original_code=fix_data["original_code"],
+                suggested_code=fix_data["suggested_code"],
+                reasoning=fix_data["reasoning"],
+                confidence=float(fix_data.get("confidence", 0.7)),
+                pattern=pattern,
+            )
+
+        return None
+
     def _build_fix_prompt(
         self, failure: Dict[str, Any], pattern: str, file_content: Optional[str] = None
     ) -> str:
         """Build the appropriate prompt based on error pattern."""
         # Get pattern-specific prompt or use generic
-        prompt_template = self.FIX_PROMPTS.get(pattern, self.FIX_PROMPTS["selector_timeout"])
+        format_prompt = self.FIX_PROMPT_FORMATTERS.get(
+            pattern, self.FIX_PROMPT_FORMATTERS["selector_timeout"]
+        )
 
         # Format with failure data
-        return prompt_template.format(
-            file_path=failure["file_path"],
-            line_number=failure.get("line_number", "unknown"),
-            error_message=failure["error_message"],
+        return format_prompt(
+            {
+                "file_path": failure["file_path"],
+                "line_number": failure.get("line_number", "unknown"),
+                "error_message": failure["error_message"],
+            }
         )
 
     def _parse_fix_response(self, response_text: str) -> Optional[Dict[str, Any]]:
         """Parse AI response into fix data."""
         try:
-            # Extract JSON from response
-            json_text = response_text.strip()
-
-            # Remove markdown code blocks
-            if "```json" in json_text:
-                start = json_text.find("```json") + 7
-                end = json_text.find("```", start)
-                if end > start:
-                    json_text = json_text[start:end].strip()
-            elif "```" in json_text:
-                start = json_text.find("```") + 3
-                end = json_text.find("```", start)
-                if end > start:
-                    json_text = json_text[start:end].strip()
-
-            # Find JSON object
-            if "{" in json_text:
-                start = json_text.find("{")
-                end = json_text.rfind("}")
-                if start >= 0 and end > start:
-                    json_text = json_text[start : end + 1]
-                    return json.loads(json_text)
-
-            return None
-
-        except json.JSONDecodeError as e:
+            # One pass from the first "{", ignoring markdown fences and prose
+            return extract_json_object(response_text)
+        except ValueError as e:
             self.logger.warning(f"Failed to parse fix response: {e}")
             return None
 
@@ -209,6 +386,10 @@ Return ONLY valid JSON:
 class GitHubBranchManager:
     """Manages GitHub branch operations for auto-fix."""
 
+    # Author and committer of auto-fix commits
+    COMMITTER_NAME = "Playwright Auto-Fixer"
+    COMMITTER_EMAIL = "autofix@playwright-analyzer"
+
     def __init__(self, token: str, repository: str):
         """Initialize the branch manager."""
         self.token = token
@@ -232,34 +413,61 @@ class GitHubBranchManager:
         branch_name = f"autofix/issue-{issue_number}-{pattern}"
 
         try:
-            # Configure git
-            subprocess.run(
-                ["git", "config", "user.name", "Playwright Auto-Fixer"], check=True
-            )  # nosec B603 B607
-            subprocess.run(
-                ["git", "config", "user.email", "autofix@playwright-analyzer"],
-                check=True,  # nosec B603 B607
-            )
-
             # Create and checkout new branch
             subprocess.run(["git", "checkout", "-b", branch_name], check=True)  # nosec B603 B607
 
-            # Apply fixes
+            # Apply fixes, one worker per file so edits to a file stay in order and
+            # each file is read and written once
+            fixes_by_file: Dict[str, List[FixSuggestion]] = {}
             for fix in fix_suggestions:
-                self._apply_fix_to_file(fix)
+                fixes_by_file.setdefault(fix.file_path, []).append(fix)
+            applied_by_file: Dict[str, int] = {}
+            if fixes_by_file:
+                with ThreadPoolExecutor(max_workers=min(16, len(fixes_by_file))) as executor:
+                    applied_by_file = dict(
+                        zip(
+                            fixes_by_file,
+                            executor.map(
+                                self._apply_fixes_to_file, fixes_by_file, fixes_by_file.values()
+                            ),
+                        )
+                    )
+
+            # Only files that were actually rewritten are committed; a suggestion
+            # for a missing file would otherwise fail the whole commit
+            fixed_paths = [path for path, applied in applied_by_file.items() if applied]
+            if not fixed_paths:
+                self.logger.warning("No fixes could be applied, skipping fix branch")
+                return None
 
             # Commit changes
             commit_message = f"""🤖 Auto-fix: Apply suggested fixes for issue #{issue_number}
 
 Pattern: {pattern}
-Fixes applied: {len(fix_suggestions)}
+Fixes applied: {sum(applied_by_file.values())}
 
 ⚠️ This is an AI-generated fix. Review before merging.
 
 Co-authored-by: Playwright Failure Analyzer <noreply@playwright-analyzer>
 """
-            subprocess.run(["git", "add", "."], check=True)  # nosec B603 B607
-            subprocess.run(["git", "commit", "-m", commit_message], check=True)  # nosec B603 B607
+            # Stage the fixed files (tracked or not), then commit just those; the
+            # identity is passed with -c so the repository's git config is left untouched
+            subprocess.run(["git", "add", "--", *fixed_paths], check=True)  # nosec B603 B607
+            subprocess.run(
+                [
+                    "git",
+                    "-c",
+                    f"user.name={self.COMMITTER_NAME}",
+                    "-c",
+                    f"user.email={self.COMMITTER_EMAIL}",
+                    "commit",
+                    "-m",
+                    commit_message,
+                    "--",
+                    *fixed_paths,
+                ],
+                check=True,
+            )  # nosec B603 B607
 
             # Push branch
             subprocess.run(
@@ -273,25 +481,39 @@ Co-authored-by: Playwright Failure Analyzer <noreply@playwright-analyzer>
             self.logger.error(f"Failed to create fix branch: {e}")
             return None
 
-    def _apply_fix_to_file(self, fix: FixSuggestion) -> None:
-        """Apply a fix suggestion to a file."""
+    def _apply_fixes_to_file(self, file_path: str, fixes: List[FixSuggestion]) -> int:
+        """
+        Apply every fix for one file with a single read and write.
+
+        Returns:
+            Number of fixes written to the file (0 if it was left unchanged)
+        """
         try:
-            with open(fix.file_path, "r", encoding="utf-8") as f:
+            with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
 
             # Simple replacement (in production, use more sophisticated line-based replacement)
-            if fix.original_code in content:
-                updated_content = content.replace(fix.original_code, fix.suggested_code, 1)
-
-                with open(fix.file_path, "w", encoding="utf-8") as f:
-                    f.write(updated_content)
-
-                self.logger.info(f"Applied fix to {fix.file_path}")
-            else:
-                self.logger.warning(f"Could not find original code in {fix.file_path}")
+            applied = 0
+            for fix in fixes:
+                # One scan locates the code; splicing matches replace(..., 1)
+                start = content.find(fix.original_code)
+                if start < 0:
+                    self.logger.warning(f"Could not find original code in {file_path}")
+                    continue
+                end = start + len(fix.original_code)
+                content = content[:start] + fix.suggested_code + content[end:]
+                applied += 1
+
+            if applied:
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+                self.logger.info(f"Applied {applied} fix(es) to {file_path}")
+            return applied
 
         except Exception as e:
-            self.logger.error(f"Failed to apply fix to {fix.file_path}: {e}")
+            self.logger.error(f"Failed to apply fixes to {file_path}: {e}")
+            return 0
 
 
 def format_fix_for_issue(fix: FixSuggestion) -> str:
@@ -6,12 +6,19 @@ This module handles creating and managing GitHub issues for test failures.
 """
 
 import argparse
+import hashlib
 import json
 import os
+import re
+import tempfile
 import time
+from functools import partial
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from error_handling import (
     ActionError,
@@ -30,6 +37,8 @@ from utils import (
     get_branch_name,
     get_github_context,
     get_relative_path,
+    json_dumps,
+    json_loads,
     parse_comma_separated,
     sanitize_for_github,
     set_github_output,
@@ -38,9 +47,14 @@ from utils import (
 )
 
 try:
-    from ai_analysis import AIAnalysisFormatter, AIAnalysisResult, analyze_failures_with_ai
+    from ai_analysis import (
+        LITELLM_AVAILABLE,
+        AIAnalysisFormatter,
+        AIAnalysisResult,
+        analyze_failures_with_ai,
+    )
 
-    AI_ANALYSIS_AVAILABLE = True
+    AI_ANALYSIS_AVAILABLE = LITELLM_AVAILABLE
 except ImportError:
     # AI analysis not available - create dummy implementations
     AI_ANALYSIS_AVAILABLE = False
@@ -79,6 +93,19 @@ except ImportError:
 class GitHubAPIClient:
     """Client for interacting with the GitHub API."""
 
+    # Connection errors and transient server errors are retried with backoff
+    # by the connection pool. POST is only retried when the request was never
+    # sent, so an issue is not created twice. Retry-After is not honoured here:
+    # rate limits (429) are handled in _make_request so the wait can be reported.
+    RETRY = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "PATCH"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+
     def __init__(self, token: str, repository: str, error_handler: ActionErrorHandler):
         self.token = token
         self.repository = repository
@@ -93,42 +120,52 @@ class GitHubAPIClient:
                 "User-Agent": "playwright-failure-bundler/1.0",
             }
         )
+        # Every request goes to api.github.com, so one kept-alive pool suffices
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=self.RETRY)
+        )
 
     def _make_request(
-        self, method: str, endpoint: str, data: Dict = None, max_retries: int = 3
+        self,
+        method: str,
+        endpoint: str,
+        data: Dict = None,
+        max_retries: int = 3,
+        headers: Optional[Dict[str, str]] = None,
     ) -> requests.Response:
-        """Make a request to the GitHub API with retry logic."""
+        """Make a request to the GitHub API, waiting out rate limits."""
         url = f"{self.base_url}{endpoint}"
 
-        for attempt in range(max_retries):
-            try:
-                if method.upper() == "GET":
-                    response = self.session.get(url, params=data)
-                elif method.upper() == "POST":
-                    response = self.session.post(url, json=data)
-                elif method.upper() == "PATCH":
-                    response = self.session.patch(url, json=data)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
+        method = method.upper()
+        params = None
+        body = None
+        request_headers = headers
+        if method == "GET":
+            params = data
+        elif method in ("POST", "PATCH"):
+            # Encode the body once rather than on every rate-limit retry
+            body = json_dumps(data) if data is not None else None
+            request_headers = {**(headers or {}), "Content-Type": "application/json"}
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
 
-                # Handle rate limiting
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", 60))
-                    print(f"Rate limited. Waiting {retry_after} seconds...")
-                    time.sleep(retry_after)
-                    continue
+        for _ in range(max_retries):
+            response = self.session.request(
+                method, url, params=params, data=body, headers=request_headers
+            )
 
-                # Handle other errors
-                if response.status_code >= 400:
-                    self.api_error_handler.handle_api_error(response)
+            # Handle rate limiting
+            if response.status_code == 429:
+                retry_after = int(response.headers.get("Retry-After", 60))
+                print(f"Rate limited. Waiting {retry_after} seconds...")
+                time.sleep(retry_after)
+                continue
 
-                return response
+            # Handle other errors
+            if response.status_code >= 400:
+                self.api_error_handler.handle_api_error(response)
 
-            except requests.RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                print(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
-                time.sleep(2**attempt)  # Exponential backoff
+            return response
 
         raise RuntimeError("Max retries exceeded")
 
@@ -141,8 +178,51 @@ class GitHubAPIClient:
             "order": "desc",
         }
 
-        response = self._make_request("GET", endpoint, params)
-        return response.json().get("items", [])
+        # Revalidate the last result for this query; a 304 carries no body to download
+        cache_path = self._search_cache_path(params)
+        cached = self._read_search_cache(cache_path)
+        headers = {"If-None-Match": cached["etag"]} if cached else None
+
+        response = self._make_request("GET", endpoint, params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["items"]
+
+        items = response.json().get("items", [])
+        etag = response.headers.get("ETag")
+        if cache_path and isinstance(etag, str):
+            self._write_search_cache(cache_path, {"etag": etag, "items": items})
+        return items
+
+    def _search_cache_path(self, params: Dict[str, str]) -> Optional[Path]:
+        """Get the AI_CACHE_DIR file for a search query, if caching is enabled."""
+        cache_dir = os.getenv("AI_CACHE_DIR")
+        if not cache_dir:
+            return None
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return Path(cache_dir).expanduser() / f"search-{key}.json"
+
+    def _read_search_cache(self, cache_path: Optional[Path]) -> Optional[Dict[str, Any]]:
+        """Read a cached search result, ignoring missing or unreadable entries."""
+        if not cache_path:
+            return None
+        try:
+            cached = json_loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or "etag" not in cached or "items" not in cached:
+            return None
+        return cached
+
+    def _write_search_cache(self, cache_path: Path, entry: Dict[str, Any]) -> None:
+        """Atomically store a search result with its ETag."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
 
     def create_issue(
         self,
@@ -186,6 +266,18 @@ class GitHubAPIClient:
 class IssueFormatter:
     """Formats test failure data into GitHub issue content."""
 
+    FAILURE_DETAIL_TEMPLATE = """### {index}. {test_name}
+
+- **File**: `{file_path}`
+- **Duration**: {duration}
+- **Retries**: {retry_count}
+- **Error**: `{error_message}`
+
+**Stack Trace**:
+```
+{stack_trace}
+```"""
+
     def __init__(self, github_context: Dict[str, str]):
         self.github_context = github_context
 
@@ -262,37 +354,22 @@ class IssueFormatter:
         details = ["## 📋 Failure Details"]
 
         for i, failure in enumerate(failures, 1):
-            # Handle both dict and object formats
-            if hasattr(failure, "test_name"):
-                # TestFailure object
-                test_name = strip_ansi_codes(failure.test_name)
-                file_path = get_relative_path(failure.file_path or "")
-                error_message = strip_ansi_codes(failure.error_message or "No error message")
-                stack_trace = format_stack_trace(failure.stack_trace or "")
-                duration = format_duration(failure.duration or 0)
-                retry_count = failure.retry_count or 0
-            else:
-                # Dictionary format
-                test_name = strip_ansi_codes(failure.get("test_name", "Unknown Test"))
-                file_path = get_relative_path(failure.get("file_path", ""))
-                error_message = strip_ansi_codes(failure.get("error_message", "No error message"))
-                stack_trace = format_stack_trace(failure.get("stack_trace", ""))
-                duration = format_duration(failure.get("duration", 0))
-                retry_count = failure.get("retry_count", 0)
-
-            failure_section = f"""### {i}. {test_name}
-
-- **File**: `{file_path}`
-- **Duration**: {duration}
-- **Retries**: {retry_count}
-- **Error**: `{error_message}`
-
-**Stack Trace**:
-```
-{stack_trace}
-```"""
-
-            details.append(failure_section)
+            # Handle both dict and TestFailure object formats through one lookup
+            get = failure.get if isinstance(failure, dict) else partial(getattr, failure)
+
+            details.append(
+                self.FAILURE_DETAIL_TEMPLATE.format(
+                    index=i,
+                    test_name=strip_ansi_codes(get("test_name", None) or "Unknown Test"),
+                    file_path=get_relative_path(get("file_path", None) or ""),
+                    error_message=strip_ansi_codes(
+                        get("error_message", None) or "No error message"
+                    ),
+                    stack_trace=format_stack_trace(get("stack_trace", None) or ""),
+                    duration=format_duration(get("duration", None) or 0),
+                    retry_count=get("retry_count", None) or 0,
+                )
+            )
 
         return "\n\n".join(details)
 
@@ -301,7 +378,7 @@ class IssueFormatter:
         context = self.github_context
         metadata = summary.get("metadata", {})
 
-        debug_info = f"""## 🔍 Debug Information
+        rows = [f"""## 🔍 Debug Information
 
 | Field | Value |
 |-------|-------|
@@ -311,19 +388,19 @@ class IssueFormatter:
 | **Run ID** | [{context['run_id']}]({context['server_url']}/{context['repository']}/actions/runs/{context['run_id']}) |
 | **Workflow** | {context['workflow']} |
 | **Actor** | @{context['actor']} |
-| **Timestamp** | {format_timestamp()} |"""
+| **Timestamp** | {format_timestamp()} |"""]
 
         if metadata.get("playwright_version"):
-            debug_info += f"\n| **Playwright Version** | {metadata['playwright_version']} |"
+            rows.append(f"| **Playwright Version** | {metadata['playwright_version']} |")
 
         if metadata.get("projects"):
             projects = ", ".join(metadata["projects"])
-            debug_info += f"\n| **Projects** | {projects} |"
+            rows.append(f"| **Projects** | {projects} |")
 
         if metadata.get("workers"):
-            debug_info += f"\n| **Workers** | {metadata['workers']} |"
+            rows.append(f"| **Workers** | {metadata['workers']} |")
 
-        return debug_info
+        return "\n".join(rows)
 
     def _format_next_steps(self) -> str:
         """Format the next steps section."""
@@ -379,6 +456,17 @@ class IssueFormatter:
 class IssueManager:
     """Manages the creation and deduplication of GitHub issues."""
 
+    # GitHub's limit on issue body length
+    MAX_BODY_LENGTH = 65536
+
+    # Hidden marker carrying the digest of the body an issue was last written with
+    BODY_DIGEST_MARKER = "<!-- body-sha256:{digest} -->"
+    BODY_DIGEST_PATTERN = re.compile(r"<!-- body-sha256:([0-9a-f]{64}) -->")
+
+    # Debug rows that change on every run, left out of the digest so a re-run
+    # with the same failures does not count as a change
+    RUN_SPECIFIC_ROW_PATTERN = re.compile(r"^\| \*\*(?:Run ID|Timestamp)\*\* \|.*\n?", re.M)
+
     def __init__(self, github_client: GitHubAPIClient, formatter: IssueFormatter):
         self.github_client = github_client
         self.formatter = formatter
@@ -404,6 +492,9 @@ class IssueManager:
         body = self.formatter.format_issue_body(
             summary, ai_analysis, fix_suggestions, auto_fix_mode, branch_name
         )
+        digest = self._body_digest(body)
+        marker = self.BODY_DIGEST_MARKER.format(digest=digest)
+        body = f"{truncate_text(body, self.MAX_BODY_LENGTH - len(marker) - 2)}\n\n{marker}"
 
         # Add auto-fix labels based on AI analysis
         enhanced_labels = self._enhance_labels_with_autofix(labels, ai_analysis)
@@ -415,8 +506,12 @@ class IssueManager:
                 print(
                     f"Found existing issue #{existing_issue['number']}: {existing_issue['title']}"
                 )
-                # Update the existing issue with new information
-                self.github_client.update_issue(existing_issue["number"], body=body)
+                existing_digest = self.BODY_DIGEST_PATTERN.search(existing_issue.get("body") or "")
+                if existing_digest and existing_digest.group(1) == digest:
+                    print("Existing issue is already up to date, skipping update")
+                else:
+                    # Update the existing issue with new information
+                    self.github_client.update_issue(existing_issue["number"], body=body)
                 return existing_issue["number"], existing_issue["html_url"], False
 
         # Create new issue
@@ -424,6 +519,11 @@ class IssueManager:
         issue = self.github_client.create_issue(title, body, enhanced_labels, assignees)
         return issue["number"], issue["html_url"], True
 
+    def _body_digest(self, body: str) -> str:
+        """Hash the issue body, ignoring rows that differ between runs."""
+        stable_body = self.RUN_SPECIFIC_ROW_PATTERN.sub("", body)
+        return hashlib.sha256(stable_body.encode("utf-8")).hexdigest()
+
     def _enhance_labels_with_autofix(self, base_labels: List[str], ai_analysis) -> List[str]:
         """Add auto-fix related labels based on AI analysis."""
         labels = base_labels.copy() if base_labels else []
@@ -503,18 +603,17 @@ def main():
     validator.validate_github_token(github_token)
     validator.validate_repository(repository)
 
-    # Load failure summary
-    if not os.path.exists(args.summary_file):
+    # Load failure summary; a missing file surfaces from open() rather than a separate stat
+    try:
+        with open(args.summary_file, "rb") as f:
+            summary = json_loads(f.read())
+    except FileNotFoundError:
         raise ActionError(
             code=ErrorCodes.FILE_NOT_FOUND,
             message=f"Failure summary file not found: {args.summary_file}",
             severity=ErrorSeverity.HIGH,
             suggestions=["Ensure the parse_report.py script ran successfully"],
         )
-
-    try:
-        with open(args.summary_file, "r", encoding="utf-8") as f:
-            summary = json.load(f)
     except json.JSONDecodeError as e:
         raise ActionError(
             code=ErrorCodes.INVALID_JSON,
@@ -565,13 +664,13 @@ def main():
             try:
                 # Get AI model from environment
                 ai_model = os.getenv("AI_MODEL", "gpt-4o-mini")
-                fix_generator = AutoFixGenerator(model=ai_model)
+                fix_generator = AutoFixGenerator(
+                    model=ai_model, escalation_model=os.getenv("AI_FIX_ESCALATION_MODEL")
+                )
 
-                fix_suggestions = []
-                for failure in summary["failures"][:3]:  # Limit to first 3 failures
-                    fix = fix_generator.generate_fix(failure)
-                    if fix:
-                        fix_suggestions.append(fix)
+                # Limit to first 3 failures, generated concurrently
+                fixes = fix_generator.generate_fixes(summary["failures"][:3])
+                fix_suggestions = [fix for fix in fixes if fix]
 
                 if fix_suggestions:
                     print(f"Generated {len(fix_suggestions)} fix suggestions")
@@ -6,18 +6,19 @@ This module provides comprehensive error handling, validation, and recovery
 mechanisms for the Playwright Failure Bundler action.
 """
 
-import json
 import logging
 import os
 import sys
 import traceback
 from dataclasses import dataclass
 from enum import Enum
-from functools import wraps
+from functools import lru_cache, wraps
 from typing import Any, Callable, Dict, List, Optional
 
 import requests
 
+from utils import json_dumps, json_dumps_indented
+
 
 class ErrorSeverity(Enum):
     """Error severity levels."""
@@ -28,6 +29,10 @@ class ErrorSeverity(Enum):
     CRITICAL = "critical"
 
 
+# Neither slots nor frozen: slots=True breaks the zero-argument super() in
+# __post_init__ (the class is recreated), BaseException instances keep a
+# __dict__ regardless, and frozen exceptions cannot have __context__ or
+# __traceback__ assigned when they are chained (e.g. by contextlib).
 @dataclass
 class ActionError(Exception):
     """Represents an error that occurred during action execution."""
@@ -77,9 +82,37 @@ class ErrorCodes:
     VALIDATION_ERROR = "VALIDATION_ERROR"
 
 
+class JsonFormatter(logging.Formatter):
+    """Formats each log record as one JSON object per line."""
+
+    # Extra record attributes copied into the JSON entry when present
+    EXTRA_FIELDS = ("code", "severity")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json_dumps(entry).decode("utf-8")
+
+
 class ActionErrorHandler:
     """Centralized error handling for the action."""
 
+    # Process exit code for each error severity
+    EXIT_CODES = {
+        ErrorSeverity.LOW: 0,
+        ErrorSeverity.MEDIUM: 1,
+        ErrorSeverity.HIGH: 2,
+        ErrorSeverity.CRITICAL: 3,
+    }
+
     def __init__(self, debug_mode: bool = False):
         self.debug_mode = debug_mode
         self.setup_logging()
@@ -87,37 +120,40 @@ class ActionErrorHandler:
     def setup_logging(self):
         """Setup logging configuration."""
         level = logging.DEBUG if self.debug_mode else logging.INFO
+        handler = logging.StreamHandler(sys.stderr)
+        # ACTION_LOG_FORMAT=json emits structured lines for log ingestion
+        if os.getenv("ACTION_LOG_FORMAT", "").lower() == "json":
+            handler.setFormatter(JsonFormatter())
         logging.basicConfig(
             level=level,
             format="%(asctime)s - %(levelname)s - %(message)s",
-            handlers=[logging.StreamHandler(sys.stderr)],
+            handlers=[handler],
         )
         self.logger = logging.getLogger(__name__)
 
     def handle_error(self, error: ActionError) -> None:
         """Handle an action error with appropriate logging and exit."""
-        self.logger.error(f"[{error.code}] {error.message}")
+        self.logger.error(
+            "[%s] %s",
+            error.code,
+            error.message,
+            extra={"code": error.code, "severity": error.severity.value},
+        )
 
-        if error.details:
-            self.logger.debug(f"Error details: {json.dumps(error.details, indent=2)}")
+        # Details are only logged at DEBUG, so skip serializing them otherwise
+        if error.details and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Error details: %s", json_dumps_indented(error.details))
 
         if error.suggestions:
-            print("\n💡 Suggestions:", file=sys.stderr)
-            for suggestion in error.suggestions:
-                print(f"  • {suggestion}", file=sys.stderr)
+            # One write for the whole block rather than a flushed print per line
+            lines = "".join(f"  • {suggestion}\n" for suggestion in error.suggestions)
+            sys.stderr.write(f"\n💡 Suggestions:\n{lines}")
 
         # Set GitHub Actions error annotation
         print(f"::error title={error.code}::{error.message}")
 
         # Exit with appropriate code based on severity
-        exit_code = {
-            ErrorSeverity.LOW: 0,
-            ErrorSeverity.MEDIUM: 1,
-            ErrorSeverity.HIGH: 2,
-            ErrorSeverity.CRITICAL: 3,
-        }.get(error.severity, 1)
-
-        sys.exit(exit_code)
+        sys.exit(self.EXIT_CODES.get(error.severity, 1))
 
     def create_error(
         self,
@@ -148,27 +184,39 @@ def error_handler(handler: ActionErrorHandler):
             except ActionError as e:
                 handler.handle_error(e)
             except Exception as e:
-                # Convert unexpected exceptions to ActionError
-                error = handler.create_error(
-                    code=ErrorCodes.UNEXPECTED_ERROR,
-                    message=f"Unexpected error in {func.__name__}: {str(e)}",
-                    severity=ErrorSeverity.CRITICAL,
-                    details={
-                        "function": func.__name__,
-                        "exception_type": type(e).__name__,
-                        "traceback": (traceback.format_exc() if handler.debug_mode else None),
-                    },
-                )
-                handler.handle_error(error)
+                _handle_unexpected_error(handler, func, e)
 
         return wrapper
 
     return decorator
 
 
+def _handle_unexpected_error(handler: ActionErrorHandler, func: Callable, e: Exception) -> None:
+    """Convert an unexpected exception to an ActionError and handle it."""
+    error = handler.create_error(
+        code=ErrorCodes.UNEXPECTED_ERROR,
+        message=f"Unexpected error in {func.__name__}: {str(e)}",
+        severity=ErrorSeverity.CRITICAL,
+        details={
+            "function": func.__name__,
+            "exception_type": type(e).__name__,
+            # Only formatted when the DEBUG details record will be emitted
+            "traceback": (
+                "".join(traceback.format_exception(e))
+                if handler.debug_mode and handler.logger.isEnabledFor(logging.DEBUG)
+                else None
+            ),
+        },
+    )
+    handler.handle_error(error)
+
+
 class ConfigValidator:
     """Validates action configuration and inputs."""
 
+    # Prefixes of GitHub token types, checked in one str.startswith call
+    VALID_TOKEN_PREFIXES = ("ghp_", "gho_", "ghu_", "ghs_", "ghr_")
+
     def __init__(self, error_handler: ActionErrorHandler):
         self.error_handler = error_handler
 
@@ -187,8 +235,7 @@ class ConfigValidator:
             )
 
         # Basic format validation
-        valid_prefixes = ["ghp_", "gho_", "ghu_", "ghs_", "ghr_"]
-        if not any(token.startswith(prefix) for prefix in valid_prefixes) and len(token) != 40:
+        if not token.startswith(self.VALID_TOKEN_PREFIXES) and len(token) != 40:
             raise ActionError(
                 code=ErrorCodes.INVALID_TOKEN,
                 message="GitHub token appears to have invalid format",
@@ -213,7 +260,8 @@ class ConfigValidator:
                 ],
             )
 
-        if "/" not in repository or repository.count("/") != 1:
+        owner, _, name = repository.partition("/")
+        if not owner or not name or "/" in name:
             raise ActionError(
                 code=ErrorCodes.INVALID_CONFIG,
                 message=f"Invalid repository format: {repository}",
@@ -458,68 +506,31 @@ class GitHubAPIErrorHandler:
     def __init__(self, error_handler: ActionErrorHandler):
         self.error_handler = error_handler
 
+    # Raise method for each specifically handled status code; 5xx and anything
+    # else fall through to handle_api_error's generic branches
+    STATUS_HANDLERS = {
+        401: "_raise_unauthorized",
+        403: "_raise_forbidden",
+        404: "_raise_not_found",
+    }
+
     def handle_api_error(self, response: requests.Response) -> None:
         """Handle GitHub API error responses."""
         status_code = response.status_code
+        # requests decodes .text on every access, so read it once
+        response_text = response.text
+        details = {"status_code": status_code, "response": response_text}
 
-        if status_code == 401:
-            raise ActionError(
-                code=ErrorCodes.INVALID_TOKEN,
-                message="GitHub API authentication failed",
-                severity=ErrorSeverity.CRITICAL,
-                details={"status_code": status_code, "response": response.text},
-                suggestions=[
-                    "Check that GITHUB_TOKEN is valid and not expired",
-                    "Ensure the token has the required permissions",
-                    "Generate a new token if necessary",
-                ],
-            )
-
-        elif status_code == 403:
-            if "rate limit" in response.text.lower():
-                raise ActionError(
-                    code=ErrorCodes.API_RATE_LIMIT,
-                    message="GitHub API rate limit exceeded",
-                    severity=ErrorSeverity.MEDIUM,
-                    details={"status_code": status_code, "response": response.text},
-                    suggestions=[
-                        "Wait for the rate limit to reset",
-                        "Consider using a different token with higher limits",
-                        "Reduce the frequency of API calls",
-                    ],
-                )
-            else:
-                raise ActionError(
-                    code=ErrorCodes.API_PERMISSION_DENIED,
-                    message="Insufficient permissions for GitHub API operation",
-                    severity=ErrorSeverity.CRITICAL,
-                    details={"status_code": status_code, "response": response.text},
-                    suggestions=[
-                        "Ensure the token has 'issues: write' permissions",
-                        "Check repository access permissions",
-                        "Verify the workflow has the correct permissions block",
-                    ],
-                )
-
-        elif status_code == 404:
-            raise ActionError(
-                code=ErrorCodes.API_NOT_FOUND,
-                message="GitHub API resource not found",
-                severity=ErrorSeverity.HIGH,
-                details={"status_code": status_code, "response": response.text},
-                suggestions=[
-                    "Check that the repository exists and is accessible",
-                    "Verify the repository name is correct",
-                    "Ensure the token has access to the repository",
-                ],
-            )
+        handler_name = self.STATUS_HANDLERS.get(status_code)
+        if handler_name:
+            getattr(self, handler_name)(response, details)
 
-        elif status_code >= 500:
+        if status_code >= 500:
             raise ActionError(
                 code=ErrorCodes.API_SERVER_ERROR,
                 message="GitHub API server error",
                 severity=ErrorSeverity.MEDIUM,
-                details={"status_code": status_code, "response": response.text},
+                details=details,
                 suggestions=[
                     "This is likely a temporary issue with GitHub",
                     "Try running the action again",
@@ -527,20 +538,85 @@ class GitHubAPIErrorHandler:
                 ],
             )
 
-        else:
+        raise ActionError(
+            code=ErrorCodes.API_SERVER_ERROR,
+            message=f"GitHub API error: {status_code}",
+            severity=ErrorSeverity.HIGH,
+            details=details,
+            suggestions=[
+                "Check the GitHub API documentation",
+                "Verify the request format is correct",
+            ],
+        )
+
+    def _raise_unauthorized(self, response: requests.Response, details: Dict[str, Any]) -> None:
+        """Raise the error for a 401 response."""
+        raise ActionError(
+            code=ErrorCodes.INVALID_TOKEN,
+            message="GitHub API authentication failed",
+            severity=ErrorSeverity.CRITICAL,
+            details=details,
+            suggestions=[
+                "Check that GITHUB_TOKEN is valid and not expired",
+                "Ensure the token has the required permissions",
+                "Generate a new token if necessary",
+            ],
+        )
+
+    def _raise_forbidden(self, response: requests.Response, details: Dict[str, Any]) -> None:
+        """Raise the error for a 403 response, distinguishing rate limits."""
+        # GitHub reports an exhausted primary limit in the headers; secondary
+        # limits only say so in the message at the start of the JSON body
+        if (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "rate limit" in details["response"][:512].lower()
+        ):
             raise ActionError(
-                code=ErrorCodes.API_SERVER_ERROR,
-                message=f"GitHub API error: {status_code}",
-                severity=ErrorSeverity.HIGH,
-                details={"status_code": status_code, "response": response.text},
+                code=ErrorCodes.API_RATE_LIMIT,
+                message="GitHub API rate limit exceeded",
+                severity=ErrorSeverity.MEDIUM,
+                details=details,
                 suggestions=[
-                    "Check the GitHub API documentation",
-                    "Verify the request format is correct",
+                    "Wait for the rate limit to reset",
+                    "Consider using a different token with higher limits",
+                    "Reduce the frequency of API calls",
                 ],
             )
 
+        raise ActionError(
+            code=ErrorCodes.API_PERMISSION_DENIED,
+            message="Insufficient permissions for GitHub API operation",
+            severity=ErrorSeverity.CRITICAL,
+            details=details,
+            suggestions=[
+                "Ensure the token has 'issues: write' permissions",
+                "Check repository access permissions",
+                "Verify the workflow has the correct permissions block",
+            ],
+        )
+
+    def _raise_not_found(self, response: requests.Response, details: Dict[str, Any]) -> None:
+        """Raise the error for a 404 response."""
+        raise ActionError(
+            code=ErrorCodes.API_NOT_FOUND,
+            message="GitHub API resource not found",
+            severity=ErrorSeverity.HIGH,
+            details=details,
+            suggestions=[
+                "Check that the repository exists and is accessible",
+                "Verify the repository name is correct",
+                "Ensure the token has access to the repository",
+            ],
+        )
+
 
 def setup_error_handling(debug_mode: bool = False) -> ActionErrorHandler:
     """Setup centralized error handling for the action."""
     debug_env = os.getenv("RUNNER_DEBUG", "").lower() in ("1", "true")
-    return ActionErrorHandler(debug_mode or debug_env)
+    return _shared_error_handler(debug_mode or debug_env)
+
+
+@lru_cache(maxsize=2)
+def _shared_error_handler(debug_mode: bool) -> ActionErrorHandler:
+    """Create one handler per debug mode, shared by every module that sets up error handling."""
+    return ActionErrorHandler(debug_mode)
@@ -23,9 +23,10 @@ from error_handling import (
     error_handler,
     setup_error_handling,
 )
+from utils import json_loads
 
 
-@dataclass
+@dataclass(slots=True)
 class TestFailure:
     """Represents a single test failure with all relevant details."""
 
@@ -64,7 +65,11 @@ class PlaywrightReportParser:
 
     def load_report(self) -> None:
         """Load and validate the JSON report file."""
-        if not os.path.exists(self.report_path):
+        # A missing file surfaces from open() rather than a separate stat
+        try:
+            with open(self.report_path, "rb") as f:
+                self.report_data = json_loads(f.read())
+        except FileNotFoundError:
             raise ActionError(
                 code=ErrorCodes.FILE_NOT_FOUND,
                 message=f"Report file not found: {self.report_path}",
@@ -75,10 +80,6 @@ class PlaywrightReportParser:
                     "Verify the report file wasn't deleted or moved",
                 ],
             )
-
-        try:
-            with open(self.report_path, "r", encoding="utf-8") as f:
-                self.report_data = json.load(f)
         except json.JSONDecodeError as e:
             raise ActionError(
                 code=ErrorCodes.INVALID_JSON,
@@ -4,10 +4,43 @@ Utility functions for the Playwright Failure Bundler action.
 """
 
 import hashlib
+import json
 import os
 import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+
+# orjson is an optional, faster drop-in for parsing reports and LLM responses
+# and encoding request bodies. Both raise a json.JSONDecodeError subclass on
+# invalid input.
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON text or bytes, with orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode an object as UTF-8 JSON bytes, with orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_dumps_indented(obj: Any) -> str:
+    """Serialize an object as JSON indented by two spaces, with orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2)
+
 
 # ANSI escape code pattern for stripping terminal colors/formatting
 ANSI_ESCAPE_PATTERN = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
@@ -62,18 +95,15 @@ def sanitize_for_github(text: str) -> str:
     """Sanitize text for safe inclusion in GitHub issues."""
     # Remove or escape potentially problematic characters
     # This is a basic implementation - could be expanded based on needs
-    sanitized = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
 
-    # Limit extremely long lines to prevent formatting issues
-    lines = sanitized.split("\n")
-    sanitized_lines = []
-    for line in lines:
-        if len(line) > 1000:
-            sanitized_lines.append(line[:997] + "...")
-        else:
-            sanitized_lines.append(line)
+    # Text this short cannot contain an overlong line
+    if len(text) <= 1000:
+        return text
 
-    return "\n".join(sanitized_lines)
+    # Limit extremely long lines to prevent formatting issues
+    return "\n".join(line[:997] + "..." if len(line) > 1000 else line for line in text.split("\n"))
 
 
 def truncate_text(text: str, max_length: int = 65536) -> str:
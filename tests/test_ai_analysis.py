@@ -3,9 +3,12 @@
 Unit tests for AI analysis functionality.
 """
 
+import asyncio
 import json
 import os
+import subprocess  # nosec B404
 import sys
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
@@ -16,16 +19,36 @@ from ai_analysis import (  # noqa: E402
     AIAnalysisFormatter,
     AIAnalysisResult,
     AIAnalyzer,
+    aanalyze_many,
+    analyze_failures_multimodel,
     analyze_failures_with_ai,
     create_ai_analyzer,
 )
 
 
+def mock_stream(text, chunk_size=16):
+    """Build a fake LiteLLM streaming response that yields text in chunks."""
+    chunks = []
+    for start in range(0, len(text), chunk_size):
+        chunk = Mock()
+        chunk.choices = [Mock()]
+        chunk.choices[0].delta.content = text[start : start + chunk_size]
+        chunks.append(chunk)
+    return chunks
+
+
+async def mock_async_stream(text, chunk_size=16):
+    """Build a fake async LiteLLM streaming response."""
+    for chunk in mock_stream(text, chunk_size):
+        yield chunk
+
+
 class TestAIAnalyzer(unittest.TestCase):
     """Test cases for AIAnalyzer."""
 
     def setUp(self):
         """Set up test fixtures."""
+        AIAnalyzer.clear_response_cache()
         self.sample_failures = [
             {
                 "test_name": "Login Test",
@@ -59,6 +82,43 @@ class TestAIAnalyzer(unittest.TestCase):
         self.assertEqual(analyzer.model, "gpt-4.1-mini")
         self.assertEqual(analyzer.max_tokens, 2500)  # Updated from 1000 to 2500
 
+    def test_litellm_configured_once(self):
+        """Test that LiteLLM globals are configured once per process."""
+        import litellm
+
+        with patch.object(AIAnalyzer, "_litellm_configured", False):
+            AIAnalyzer()
+            self.assertTrue(AIAnalyzer._litellm_configured)
+            client = litellm.client_session
+
+            with patch.object(litellm, "drop_params", False):
+                AIAnalyzer()
+                self.assertFalse(litellm.drop_params)
+                self.assertIs(litellm.client_session, client)
+
+    @patch("litellm.token_counter", side_effect=lambda model, text: len(text) // 4)
+    @patch("litellm.get_model_info")
+    def test_max_tokens_fits_context_window(self, mock_model_info, mock_token_counter):
+        """Test that max_tokens is reduced when the prompt leaves too little room."""
+        mock_model_info.return_value = {"max_input_tokens": 4000, "max_output_tokens": 16384}
+        analyzer = AIAnalyzer()
+        prompt = "x" * 4000
+
+        kwargs = analyzer._completion_kwargs(prompt)
+
+        expected = 4000 - analyzer._system_prompt_tokens - 1000 - AIAnalyzer.CONTEXT_SAFETY_TOKENS
+        self.assertEqual(kwargs["max_tokens"], expected)
+        self.assertLess(kwargs["max_tokens"], analyzer.max_tokens)
+        # The system prompt is counted once, at construction
+        self.assertEqual(mock_token_counter.call_count, 2)
+
+    @patch("litellm.get_model_info", side_effect=Exception("unknown model"))
+    def test_max_tokens_unknown_model(self, mock_model_info):
+        """Test that models missing from LiteLLM's map keep the configured max_tokens."""
+        analyzer = AIAnalyzer(model="custom/model")
+
+        self.assertEqual(analyzer._completion_kwargs("prompt")["max_tokens"], 2500)
+
     def test_create_analysis_prompt(self):
         """Test prompt creation for AI analysis."""
         analyzer = AIAnalyzer()
@@ -72,6 +132,94 @@ class TestAIAnalyzer(unittest.TestCase):
         self.assertIn("Playwright Version: 1.40.0", prompt)
         self.assertIn("Total Tests: 10", prompt)
 
+    def test_create_analysis_prompt_truncates_long_fields(self):
+        """Test that oversized failure fields are clamped in the prompt."""
+        analyzer = AIAnalyzer()
+        failures = [
+            {
+                "test_name": "Visual Test",
+                "file_path": "tests/visual.spec.ts",
+                "error_message": "Screenshot mismatch " + "x" * 5000,
+                "stack_trace": "y" * 5000,
+            }
+        ]
+
+        prompt = analyzer._create_analysis_prompt(failures, self.sample_metadata)
+
+        self.assertIn("Screenshot mismatch", prompt)
+        self.assertNotIn("x" * (AIAnalyzer.MAX_ERROR_MESSAGE_CHARS + 1), prompt)
+        self.assertNotIn("y" * (AIAnalyzer.MAX_STACK_TRACE_CHARS + 1), prompt)
+        self.assertIn("(truncated)", prompt)
+
+    @patch("litellm.decode", side_effect=lambda model, tokens: " ".join(tokens))
+    @patch("litellm.encode", side_effect=lambda model, text: text.split(" "))
+    @patch("litellm.get_model_info", return_value={"max_input_tokens": 128000})
+    def test_create_analysis_prompt_truncates_by_tokens(self, *mocks):
+        """Test that error fields are capped by token count when the tokenizer is known."""
+        analyzer = AIAnalyzer()
+        failures = [{"test_name": "Token Test", "error_message": "w " * 150 + "END"}]
+
+        prompt = analyzer._create_analysis_prompt(failures, self.sample_metadata)
+
+        error_line = next(line for line in prompt.splitlines() if "Error:" in line)
+        self.assertEqual(error_line.count("w"), AIAnalyzer.MAX_ERROR_MESSAGE_TOKENS)
+        self.assertTrue(error_line.endswith("... (truncated)"))
+        self.assertNotIn("END", prompt)
+
+    def test_normalize_failures(self):
+        """Test that failures are validated once: defaults, str coercion, bad entries dropped."""
+        failures = [{"test_name": "Partial", "stack_trace": None, "error_message": 42}, "bogus"]
+
+        with self.assertLogs("ai_analysis", level="WARNING"):
+            normalized = AIAnalyzer._normalize_failures(failures)
+
+        self.assertEqual(len(normalized), 1)
+        self.assertEqual(normalized[0]["stack_trace"], "")
+        self.assertEqual(normalized[0]["error_message"], "42")
+        self.assertEqual(normalized[0]["file_path"], "unknown")
+        self.assertNotIn("file_path", failures[0])
+
+    def test_create_analysis_prompt_deduplicates_retries(self):
+        """Test that retried failures with the same error appear once in the prompt."""
+        analyzer = AIAnalyzer()
+        failures = [self.sample_failures[0]] * 3 + [self.sample_failures[1]]
+
+        prompt = analyzer._create_analysis_prompt(failures, self.sample_metadata)
+
+        self.assertEqual(prompt.count("Test: Login Test"), 1)
+        self.assertIn("Test: Dashboard Test", prompt)
+        self.assertIn("Failed Tests: 4", prompt)
+        self.assertNotIn("Similar Failures", prompt)
+        self.assertNotIn("more similar failures", prompt)
+
+    def test_create_analysis_prompt_clusters_similar_failures(self):
+        """Test that near-identical errors from different tests share one prompt entry."""
+        analyzer = AIAnalyzer()
+        failures = [
+            {
+                "test_name": f"Checkout Test {i}",
+                "error_message": f"Timeout {i}000ms exceeded waiting for locator('#pay')",
+                "stack_trace": f"at tests/checkout.spec.ts:{i}:5",
+            }
+            for i in range(1, 7)
+        ] + self.sample_failures
+
+        prompt = analyzer._create_analysis_prompt(failures, self.sample_metadata)
+
+        self.assertEqual(prompt.count("Test: Checkout Test"), 1)
+        self.assertIn("Similar Failures: 5 more with this error", prompt)
+        self.assertIn("Test: Login Test", prompt)
+        self.assertIn("Test: Dashboard Test", prompt)
+        self.assertNotIn("more similar failures", prompt)
+
+    @patch("litellm.completion")
+    def test_analyze_failures_empty_skips_llm(self, mock_completion):
+        """Test that an empty failure list never reaches the LLM."""
+        analyzer = AIAnalyzer()
+
+        self.assertIsNone(analyzer.analyze_failures([], self.sample_metadata))
+        mock_completion.assert_not_called()
+
     def test_parse_json_response(self):
         """Test parsing of JSON response from AI."""
         analyzer = AIAnalyzer()
@@ -99,6 +247,121 @@ class TestAIAnalyzer(unittest.TestCase):
         self.assertAlmostEqual(result.confidence_score, 0.7225, places=3)
         self.assertEqual(len(result.error_patterns), 2)
 
+    def test_parse_json_response_with_surrounding_text(self):
+        """Test that fenced JSON followed by prose is still decoded."""
+        analyzer = AIAnalyzer()
+
+        response = (
+            "Here is the analysis:\n```json\n"
+            + json.dumps({"summary": "Selector drift", "suggested_actions": ["Use {id}"]})
+            + "\n```\nLet me know if {you} need more."
+        )
+
+        result = analyzer._parse_analysis_response(response)
+
+        self.assertEqual(result.summary, "Selector drift")
+        self.assertEqual(result.suggested_actions, ["Use {id}"])
+
+    def test_parse_json_response_drops_malformed_fields(self):
+        """Test that fields of the wrong JSON type fall back to their defaults."""
+        analyzer = AIAnalyzer()
+        response = json.dumps(
+            {
+                "summary": "Flaky login",
+                "suggested_actions": "Add waits",
+                "priority_assessment": ["Login Test"],
+                "specific_fixes": ["Fix the selector"],
+                "quick_wins": ["Retry once"],
+            }
+        )
+
+        with self.assertLogs("ai_analysis", level="WARNING"):
+            result = analyzer._parse_analysis_response(response)
+
+        self.assertEqual(result.summary, "Flaky login")
+        self.assertEqual(result.suggested_actions, [])
+        self.assertIsNone(result.priority_assessment)
+        self.assertIsNone(result.specific_fixes)
+        self.assertEqual(result.quick_wins, ["Retry once"])
+        self.assertIn("Flaky login", AIAnalysisFormatter.format_analysis_section(result))
+
+    def test_parse_json_response_null_confidence(self):
+        """Test that a null confidence_score falls back to the default."""
+        analyzer = AIAnalyzer()
+        response = json.dumps({"summary": "Flaky login", "confidence_score": None})
+
+        with self.assertLogs("ai_analysis", level="WARNING"):
+            result = analyzer._parse_analysis_response(response)
+
+        self.assertEqual(result.summary, "Flaky login")
+        self.assertEqual(result.raw_confidence, 0.5)
+
+    def test_parse_json_response_string_scores(self):
+        """Test that non-numeric scores are dropped instead of failing the analysis."""
+        analyzer = AIAnalyzer()
+        response = json.dumps(
+            {
+                "summary": "Flaky login",
+                "confidence_score": "high",
+                "specific_fixes": [
+                    {"test": "Login Test", "fix": "Wait for button", "fixability_score": "high"},
+                    {"test": "Cart Test", "fix": "Await goto", "fixability_score": 0.9},
+                ],
+            }
+        )
+
+        with self.assertLogs("ai_analysis", level="WARNING"):
+            result = analyzer._parse_analysis_response(response)
+
+        self.assertEqual(result.raw_confidence, 0.5)
+        self.assertNotIn("fixability_score", result.specific_fixes[0])
+        self.assertNotIn("Login Test", result.auto_fix_prompt)
+        self.assertIn("Cart Test: Await goto", result.auto_fix_prompt)
+
+    def test_parse_json_response_with_braces_in_preamble(self):
+        """Test that braces in prose before the JSON object are skipped."""
+        analyzer = AIAnalyzer()
+
+        response = "Raise {timeout} as below:\n" + json.dumps({"summary": "Slow page load"})
+
+        result = analyzer._parse_analysis_response(response)
+
+        self.assertEqual(result.summary, "Slow page load")
+
+    def test_generate_auto_fix_prompt(self):
+        """Test that only highly fixable issues are listed in the auto-fix prompt."""
+        analyzer = AIAnalyzer()
+        data = {
+            "summary": "Two selector issues",
+            "specific_fixes": [
+                {"test": "a.spec.ts:3", "fix": "Await click", "fixability_score": 0.9},
+                {"test": "b.spec.ts:8", "fix": "Rework flow", "fixability_score": 0.4},
+                {
+                    "test": "c.spec.ts:5",
+                    "fix": "Use test id",
+                    "fixability_score": 0.7,
+                    "code_hint": "page.getByTestId('login')",
+                },
+            ],
+            "error_patterns": ["missing_await", "wrong_selector"],
+        }
+
+        prompt = analyzer._generate_auto_fix_prompt(data)
+
+        self.assertEqual(
+            prompt,
+            "Summary: Two selector issues\n"
+            "\nAuto-fixable issues:\n"
+            "- a.spec.ts:3: Await click\n"
+            "- c.spec.ts:5: Use test id\n"
+            "  Code: page.getByTestId('login')\n"
+            "\nError patterns: missing_await, wrong_selector",
+        )
+        self.assertEqual(
+            analyzer._generate_auto_fix_prompt({"specific_fixes": data["specific_fixes"][1:2]}),
+            "No auto-fix guidance available",
+        )
+
     def test_parse_text_response(self):
         """Test parsing of plain text response as fallback."""
         analyzer = AIAnalyzer()
@@ -118,23 +381,32 @@ class TestAIAnalyzer(unittest.TestCase):
         self.assertEqual(len(result.suggested_actions), 3)
         self.assertEqual(result.confidence_score, 0.7)  # Default for text parsing
 
-    @patch("ai_analysis.litellm.completion")
+    def test_parse_text_response_numbered_list(self):
+        """Test that numbered items beyond 2 are picked up and capped at 5."""
+        analyzer = AIAnalyzer()
+
+        text_response = "Summary line\n" + "\n".join(f"{i}. Step {i}" for i in range(1, 8))
+
+        result = analyzer._parse_text_response(text_response)
+
+        self.assertEqual(result.suggested_actions, [f"Step {i}" for i in range(1, 6)])
+
+    @patch("litellm.completion")
     @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
     def test_analyze_failures_success(self, mock_completion):
         """Test successful AI analysis."""
-        # Mock the LiteLLM response
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = json.dumps(
-            {
-                "summary": "Test failures due to timing issues",
-                "root_cause_analysis": "Tests are failing due to race conditions",
-                "suggested_actions": ["Add explicit waits", "Use stable selectors"],
-                "confidence_score": 0.9,
-                "error_patterns": ["Timeout", "Element not found"],
-            }
+        # Mock the streamed LiteLLM response
+        mock_completion.return_value = mock_stream(
+            json.dumps(
+                {
+                    "summary": "Test failures due to timing issues",
+                    "root_cause_analysis": "Tests are failing due to race conditions",
+                    "suggested_actions": ["Add explicit waits", "Use stable selectors"],
+                    "confidence_score": 0.9,
+                    "error_patterns": ["Timeout", "Element not found"],
+                }
+            )
         )
-        mock_completion.return_value = mock_response
 
         analyzer = AIAnalyzer()
         result = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
@@ -149,8 +421,312 @@ class TestAIAnalyzer(unittest.TestCase):
         call_args = mock_completion.call_args
         self.assertEqual(call_args.kwargs["model"], "gpt-4o-mini")  # Default model
         self.assertEqual(len(call_args.kwargs["messages"]), 2)
+        self.assertTrue(call_args.kwargs["stream"])
+        self.assertEqual(call_args.kwargs["response_format"], {"type": "json_object"})
+        self.assertEqual(call_args.kwargs["num_retries"], AIAnalyzer.MAX_RETRIES)
+        self.assertNotIn("fallbacks", call_args.kwargs)
+        self.assertEqual(
+            call_args.kwargs["messages"][0],
+            {"role": "system", "content": AIAnalyzer.SYSTEM_PROMPT},
+        )
+
+    @patch("litellm.completion")
+    def test_analyze_failures_marks_system_prompt_cacheable(self, mock_completion):
+        """Test that Anthropic models get a cache_control hint on the system prompt."""
+        mock_completion.return_value = mock_stream('{"summary": "ok"}')
+
+        analyzer = AIAnalyzer(model="anthropic/claude-3.5-haiku")
+        analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        system_message = mock_completion.call_args.kwargs["messages"][0]
+        self.assertEqual(system_message["content"][0]["text"], AIAnalyzer.SYSTEM_PROMPT)
+        self.assertEqual(system_message["content"][0]["cache_control"], {"type": "ephemeral"})
+
+    def test_create_analysis_prompt_shares_run_prefix(self):
+        """Test that prompts for different failures in one run start identically."""
+        analyzer = AIAnalyzer()
+        first = analyzer._create_analysis_prompt(self.sample_failures[:1], self.sample_metadata)
+        second = analyzer._create_analysis_prompt(self.sample_failures, self.sample_metadata)
+
+        prefix = first.split("- Failed Tests:")[0]
+        self.assertIn("Workers: 4", prefix)
+        self.assertTrue(second.startswith(prefix))
+
+    @patch("litellm.completion")
+    def test_analyze_failures_partial_stream(self, mock_completion):
+        """Test that an interrupted stream still yields a fallback analysis."""
+
+        def broken_stream():
+            yield from mock_stream("Selectors are stale.\n- Update selectors\n")
+            raise TimeoutError("stream timed out")
+
+        mock_completion.return_value = broken_stream()
+
+        analyzer = AIAnalyzer()
+        result = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(result.summary, "Selectors are stale.")
+        self.assertEqual(result.suggested_actions, ["Update selectors"])
+
+    @patch("litellm.completion")
+    def test_analyze_failures_stops_after_json_object(self, mock_completion):
+        """Test that streaming stops once the JSON object has closed."""
+        payload = json.dumps({"summary": 'Brace "}" and \\ in text', "nested": {"a": 1}})
+        consumed_trailer = []
+
+        def stream():
+            yield from mock_stream("Analysis: " + payload, chunk_size=3)
+            consumed_trailer.append(True)
+            yield from mock_stream("\nTrailing notes")
+
+        mock_completion.return_value = stream()
+
+        analyzer = AIAnalyzer()
+        result = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertEqual(result.summary, 'Brace "}" and \\ in text')
+        self.assertEqual(consumed_trailer, [])
+
+    @patch("litellm.completion")
+    def test_analyze_failures_stream_with_braces_in_preamble(self, mock_completion):
+        """Test that balanced braces in leading prose don't end the stream early."""
+        payload = json.dumps({"summary": "Slow page load"})
+        mock_completion.return_value = mock_stream(
+            "Raise {timeout} as below:\n" + payload, chunk_size=3
+        )
+
+        analyzer = AIAnalyzer()
+        result = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertEqual(result.summary, "Slow page load")
+        prompt = analyzer._create_analysis_prompt(self.sample_failures, self.sample_metadata)
+        cached_text = analyzer._get_cached_response(analyzer._prompt_hash(prompt))
+        self.assertTrue(cached_text.endswith(payload))
+
+    @patch("litellm.completion")
+    def test_analyze_failures_without_streaming(self, mock_completion):
+        """Test the blocking (stream=False) fallback path."""
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = json.dumps({"summary": "Blocking call"})
+        mock_completion.return_value = response
+
+        analyzer = AIAnalyzer()
+        result = analyzer.analyze_failures(self.sample_failures, self.sample_metadata, stream=False)
+
+        self.assertEqual(result.summary, "Blocking call")
+        self.assertFalse(mock_completion.call_args.kwargs["stream"])
+
+    @patch("litellm.completion")
+    def test_analyze_failures_stream(self, mock_completion):
+        """Test that analyze_failures_stream yields text fragments as they arrive."""
+        mock_completion.return_value = mock_stream("partial analysis text", chunk_size=4)
+
+        analyzer = AIAnalyzer()
+        fragments = list(
+            analyzer.analyze_failures_stream(self.sample_failures, self.sample_metadata)
+        )
+
+        self.assertGreater(len(fragments), 1)
+        self.assertEqual("".join(fragments), "partial analysis text")
+
+    @patch("litellm.completion")
+    def test_analyze_failures_fields(self, mock_completion):
+        """Test that top-level fields are yielded as soon as each is complete."""
+        analysis = {
+            "summary": 'Selector "login-button" changed, {see} below',
+            "priority_assessment": {"critical": ["Login Test"], "high": []},
+            "confidence_score": 0.85,
+            "error_patterns": ["selector", "timeout"],
+        }
+        analyzer = AIAnalyzer()
+
+        for chunk_size in (1, 7, 64):
+            mock_completion.return_value = mock_stream(
+                "```json\n" + json.dumps(analysis, indent=2) + "\n```", chunk_size
+            )
+            fields = list(
+                analyzer.analyze_failures_fields(self.sample_failures, self.sample_metadata)
+            )
+            self.assertEqual(fields, list(analysis.items()))
+
+    @patch("litellm.completion")
+    def test_analyze_failures_uses_cache(self, mock_completion):
+        """Test that a repeated analysis is served from AI_CACHE_DIR."""
+        mock_completion.return_value = mock_stream(
+            json.dumps({"summary": "Cached summary", "confidence_score": 0.9})
+        )
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with patch.dict(os.environ, {"AI_CACHE_DIR": cache_dir}):
+                analyzer = AIAnalyzer()
+                first = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+                # Simulate a new process: only the disk cache survives
+                AIAnalyzer.clear_response_cache()
+                second = analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        mock_completion.assert_called_once()
+        self.assertEqual(first.summary, "Cached summary")
+        self.assertEqual(second.summary, "Cached summary")
+
+    @patch("litellm.completion")
+    def test_analyze_failures_ignores_expired_cache(self, mock_completion):
+        """Test that disk cache entries older than CACHE_TTL_SECONDS are re-requested."""
+        mock_completion.side_effect = lambda **kwargs: mock_stream(json.dumps({"summary": "Fresh"}))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with patch.dict(os.environ, {"AI_CACHE_DIR": cache_dir}):
+                analyzer = AIAnalyzer()
+                analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+                AIAnalyzer.clear_response_cache()
+                for entry in os.listdir(cache_dir):
+                    entry_path = os.path.join(cache_dir, entry)
+                    expired = os.path.getmtime(entry_path) - AIAnalyzer.CACHE_TTL_SECONDS - 60
+                    os.utime(entry_path, (expired, expired))
+                analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertEqual(mock_completion.call_count, 2)
+
+    @patch("litellm.completion")
+    def test_analyze_failures_memoizes_in_process(self, mock_completion):
+        """Test that identical prompts reuse the in-process response memo."""
+        mock_completion.return_value = mock_stream(json.dumps({"summary": "Memoized"}))
+
+        with patch.dict(os.environ, {}, clear=True):
+            analyzer = AIAnalyzer()
+            analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+            result = AIAnalyzer().analyze_failures(self.sample_failures, self.sample_metadata)
+
+        mock_completion.assert_called_once()
+        self.assertEqual(result.summary, "Memoized")
 
-    @patch("ai_analysis.litellm.completion")
+    @patch("litellm.acompletion")
+    def test_aanalyze_many_runs_jobs_concurrently(self, mock_acompletion):
+        """Test that independent failure sets are analyzed together, failures mapped to None."""
+
+        async def respond(**kwargs):
+            if "Dashboard Test" in kwargs["messages"][1]["content"]:
+                raise RuntimeError("provider error")
+            return mock_async_stream(json.dumps({"summary": "Login shard"}))
+
+        mock_acompletion.side_effect = respond
+        jobs = [([failure], self.sample_metadata) for failure in self.sample_failures]
+
+        results = asyncio.run(aanalyze_many(jobs, analyzer=AIAnalyzer()))
+
+        self.assertEqual(mock_acompletion.call_count, 2)
+        self.assertEqual(results[0].summary, "Login shard")
+        self.assertIsNone(results[1])
+
+    @patch("litellm.acompletion")
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+    def test_analyze_failures_multimodel(self, mock_acompletion):
+        """Test that each model analyzes the failures, with failures mapped to None."""
+
+        async def respond(**kwargs):
+            if kwargs["model"] == "gpt-4o":
+                raise RuntimeError("provider error")
+            return mock_async_stream(json.dumps({"summary": f"From {kwargs['model']}"}))
+
+        mock_acompletion.side_effect = respond
+
+        results = analyze_failures_multimodel(
+            ["gpt-4o-mini", "gpt-4o", "claude-3-haiku"], self.sample_failures, self.sample_metadata
+        )
+
+        self.assertEqual(list(results), ["gpt-4o-mini", "gpt-4o", "claude-3-haiku"])
+        self.assertEqual(results["gpt-4o-mini"].summary, "From gpt-4o-mini")
+        self.assertEqual(results["claude-3-haiku"].analysis_model, "claude-3-haiku")
+        self.assertIsNone(results["gpt-4o"])
+
+    @patch("litellm.completion")
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+    def test_analyze_failures_with_ai_inside_event_loop(self, mock_completion):
+        """Test that a running event loop falls back to one synchronous analysis."""
+        mock_completion.return_value = mock_stream(json.dumps({"summary": "Single prompt"}))
+        failures = [
+            {"test_name": f"Test {i}", "error_message": f"Unique failure kind {i}" * 3}
+            for i in range(AIAnalyzer.MAX_PROMPT_FAILURES + 2)
+        ]
+
+        async def run():
+            return analyze_failures_with_ai(failures, self.sample_metadata)
+
+        result = asyncio.run(run())
+
+        mock_completion.assert_called_once()
+        self.assertEqual(result.summary, "Single prompt")
+
+    @patch("litellm.acompletion")
+    def test_analyze_failures_parallel_merges_batches(self, mock_acompletion):
+        """Test that large failure sets are analyzed in concurrent batches and merged."""
+        failures = [{"test_name": f"Test {i}", "error_message": f"Error {i % 2}"} for i in range(7)]
+
+        async def respond(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            batch_size = int(prompt.split("Failed Tests: ")[1].split()[0])
+            return mock_async_stream(
+                json.dumps(
+                    {
+                        "summary": f"Batch of {batch_size}",
+                        "suggested_actions": ["Shared action", f"Action for {batch_size}"],
+                        "error_patterns": ["timeout"],
+                        "confidence_score": 1.0 if batch_size == 5 else 0.0,
+                    }
+                )
+            )
+
+        mock_acompletion.side_effect = respond
+
+        analyzer = AIAnalyzer()
+        result = analyzer.analyze_failures_parallel(failures, self.sample_metadata, batch_size=5)
+
+        self.assertEqual(mock_acompletion.call_count, 2)
+        self.assertIn("Batch of 5", result.summary)
+        self.assertIn("Batch of 2", result.summary)
+        self.assertEqual(
+            result.suggested_actions, ["Shared action", "Action for 5", "Action for 2"]
+        )
+        self.assertEqual(result.error_patterns, ["timeout"])
+        # Raw confidence is weighted by batch size: (1.0 * 5 + 0.0 * 2) / 7
+        self.assertAlmostEqual(result.raw_confidence, 5 / 7, places=3)
+
+    def test_batch_failures_groups_by_error(self):
+        """Test that failures sharing an error signature land in the same batch."""
+        failures = [
+            {"test_name": "A", "error_message": "Timeout"},
+            {"test_name": "B", "error_message": "Selector"},
+            {"test_name": "C", "error_message": "Timeout"},
+        ]
+
+        batches = AIAnalyzer._batch_failures(failures, batch_size=2)
+
+        self.assertEqual(
+            [[f["test_name"] for f in batch] for batch in batches], [["A", "C"], ["B"]]
+        )
+
+    def test_batch_failures_groups_by_error_category(self):
+        """Test that differently worded errors of the same kind are batched together."""
+        failures = [
+            {"test_name": "A", "error_message": "Test timeout of 30000ms exceeded."},
+            {"test_name": "B", "error_message": "page.goto: net::ERR_CONNECTION_REFUSED"},
+            {"test_name": "C", "error_message": "locator.click: Timeout 5000ms exceeded."},
+        ]
+
+        normalized = AIAnalyzer._normalize_failures(failures + [{"error_message": "boom"}])
+        self.assertEqual(
+            [AIAnalyzer._error_category(failure) for failure in normalized],
+            ["timeout", "network", "timeout", "other"],
+        )
+
+        batches = AIAnalyzer._batch_failures(failures, batch_size=2)
+
+        self.assertEqual(
+            [[f["test_name"] for f in batch] for batch in batches], [["A", "C"], ["B"]]
+        )
+
+    @patch("litellm.completion")
     @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
     def test_analyze_failures_api_error(self, mock_completion):
         """Test handling of API errors."""
@@ -168,6 +744,11 @@ class TestAIAnalyzer(unittest.TestCase):
             analyzer = create_ai_analyzer()
             self.assertIsNone(analyzer)
 
+    def test_create_ai_analyzer_empty_api_key(self):
+        """Test that an empty API key (unset workflow secret) disables analysis."""
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}, clear=True):
+            self.assertIsNone(create_ai_analyzer())
+
     @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
     def test_create_ai_analyzer_with_api_key(self):
         """Test analyzer creation with API key."""
@@ -175,6 +756,62 @@ class TestAIAnalyzer(unittest.TestCase):
         self.assertIsNotNone(analyzer)
         self.assertIsInstance(analyzer, AIAnalyzer)
 
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key", "AI_REQUEST_TIMEOUT": "12.5"})
+    @patch("litellm.completion")
+    def test_create_ai_analyzer_request_timeout(self, mock_completion):
+        """Test that AI_REQUEST_TIMEOUT sets the per-request timeout."""
+        mock_completion.return_value = mock_stream('{"summary": "ok"}')
+
+        analyzer = create_ai_analyzer()
+        analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertEqual(analyzer.request_timeout, 12.5)
+        self.assertEqual(mock_completion.call_args.kwargs["timeout"], 12.5)
+
+        with patch.dict(os.environ, {"AI_REQUEST_TIMEOUT": "soon"}):
+            with self.assertLogs(level="WARNING"):
+                analyzer = create_ai_analyzer()
+            self.assertEqual(analyzer.request_timeout, AIAnalyzer.REQUEST_TIMEOUT)
+
+    @patch.dict(
+        os.environ,
+        {"OPENAI_API_KEY": "test-key", "AI_FALLBACK_MODEL": "gpt-4o-mini, claude-3-haiku"},
+    )
+    @patch("litellm.completion")
+    def test_create_ai_analyzer_fallback_models(self, mock_completion):
+        """Test that AI_FALLBACK_MODEL is passed to LiteLLM as fallbacks."""
+        mock_completion.return_value = mock_stream('{"summary": "ok"}')
+
+        analyzer = create_ai_analyzer("gpt-4o")
+        analyzer.analyze_failures(self.sample_failures, self.sample_metadata)
+
+        self.assertEqual(
+            mock_completion.call_args.kwargs["fallbacks"], ["gpt-4o-mini", "claude-3-haiku"]
+        )
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+    def test_create_ai_analyzer_reuses_instance(self):
+        """Test that repeat calls for the same model share one analyzer."""
+        self.assertIs(create_ai_analyzer("gpt-4o-mini"), create_ai_analyzer("gpt-4o-mini"))
+        self.assertIsNot(create_ai_analyzer("gpt-4o-mini"), create_ai_analyzer("gpt-4o"))
+
+    def test_litellm_not_imported_without_api_key(self):
+        """Test that litellm is only imported once AI analysis is configured."""
+        src_dir = os.path.join(os.path.dirname(__file__), "..", "src")
+        code = (
+            "import sys; sys.path.insert(0, sys.argv[1]); import ai_analysis; "
+            "ai_analysis.create_ai_analyzer(); print('litellm' in sys.modules)"
+        )
+        env = {k: v for k, v in os.environ.items() if not k.endswith("_API_KEY")}
+        result = subprocess.run(  # nosec B603
+            [sys.executable, "-c", code, src_dir],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
     def test_analyze_failures_with_ai_disabled(self):
         """Test convenience function with AI disabled."""
         result = analyze_failures_with_ai(self.sample_failures, self.sample_metadata, enabled=False)
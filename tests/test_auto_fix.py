@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AI fix generation.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from auto_fix import AutoFixGenerator  # noqa: E402
+
+
+def mock_stream(text, chunk_size=16):
+    """Build a fake LiteLLM streaming response that yields text in chunks."""
+    chunks = []
+    for start in range(0, len(text), chunk_size):
+        chunk = Mock()
+        chunk.choices = [Mock()]
+        chunk.choices[0].delta.content = text[start : start + chunk_size]
+        chunks.append(chunk)
+    return chunks
+
+
+async def mock_async_stream(text, chunk_size=16):
+    """Build a fake async LiteLLM streaming response."""
+    for chunk in mock_stream(text, chunk_size):
+        yield chunk
+
+
+def fix_response(confidence, suggested_code="await page.click('#submit');"):
+    """Build a fix response body with the given confidence."""
+    return json.dumps(
+        {
+            "original_code": "page.click('#submit');",
+            "suggested_code": suggested_code,
+            "reasoning": "page.click returns a promise",
+            "confidence": confidence,
+        }
+    )
+
+
+@patch("auto_fix.AI_AVAILABLE", True)
+class TestAutoFixGenerator(unittest.TestCase):
+    """Test cases for AutoFixGenerator."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        # Keep fixes out of any AI_CACHE_DIR configured in the environment
+        env = patch.dict(os.environ)
+        env.start()
+        self.addCleanup(env.stop)
+        os.environ.pop("AI_CACHE_DIR", None)
+
+        self.failure = {
+            "file_path": "tests/login.spec.ts",
+            "line_number": 15,
+            "error_message": "Promise returned by page.click was not awaited",
+            "suggested_pattern": "missing_await",
+        }
+
+    @patch("litellm.completion")
+    def test_low_confidence_fix_escalates(self, mock_completion):
+        """Test that a fix below MIN_FIX_CONFIDENCE is retried on the escalation model."""
+        generator = AutoFixGenerator(model="small-model", escalation_model="large-model")
+        low = AutoFixGenerator.MIN_FIX_CONFIDENCE - 0.2
+
+        def respond(**kwargs):
+            if kwargs["model"] == "small-model":
+                return mock_stream(fix_response(low, "page.click('#submit');"))
+            return mock_stream(fix_response(0.9))
+
+        mock_completion.side_effect = respond
+
+        suggestion = generator.generate_fix(self.failure)
+
+        models = [call.kwargs["model"] for call in mock_completion.call_args_list]
+        self.assertEqual(models, ["small-model", "large-model"])
+        self.assertEqual(suggestion.confidence, 0.9)
+        self.assertEqual(suggestion.suggested_code, "await page.click('#submit');")
+
+    @patch("litellm.completion")
+    def test_confident_fix_does_not_escalate(self, mock_completion):
+        """Test that a fix at or above MIN_FIX_CONFIDENCE keeps the default model's answer."""
+        generator = AutoFixGenerator(model="small-model", escalation_model="large-model")
+        mock_completion.return_value = mock_stream(fix_response(0.9))
+
+        suggestion = generator.generate_fix(self.failure)
+
+        mock_completion.assert_called_once()
+        self.assertEqual(mock_completion.call_args.kwargs["model"], "small-model")
+        self.assertEqual(suggestion.confidence, 0.9)
+
+    @patch("litellm.completion")
+    def test_low_confidence_fix_without_escalation_model(self, mock_completion):
+        """Test that low-confidence fixes are returned as-is when no escalation model is set."""
+        generator = AutoFixGenerator(model="small-model")
+        mock_completion.return_value = mock_stream(fix_response(0.3))
+
+        suggestion = generator.generate_fix(self.failure)
+
+        mock_completion.assert_called_once()
+        self.assertEqual(suggestion.confidence, 0.3)
+
+    @patch("litellm.acompletion")
+    def test_generate_fixes_shares_duplicate_calls(self, mock_acompletion):
+        """Test that failures with the same prompt share one LLM call and one suggestion."""
+
+        async def respond(**kwargs):
+            return mock_async_stream(fix_response(0.9))
+
+        mock_acompletion.side_effect = respond
+        failures = [self.failure, dict(self.failure), dict(self.failure)]
+
+        suggestions = AutoFixGenerator().generate_fixes(failures)
+
+        mock_acompletion.assert_called_once()
+        self.assertEqual(len(suggestions), 3)
+        self.assertIs(suggestions[0], suggestions[1])
+        self.assertIs(suggestions[0], suggestions[2])
+
+    @patch("litellm.acompletion")
+    def test_generate_fixes_keeps_failure_order(self, mock_acompletion):
+        """Test that suggestions follow failure order even when later calls finish first."""
+        failures = [
+            {**self.failure, "file_path": f"tests/spec{i}.spec.ts", "line_number": i}
+            for i in range(1, 4)
+        ]
+
+        async def respond(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            index = next(i for i in range(1, 4) if f"spec{i}.spec.ts" in prompt)
+            # The first failure answers last
+            await asyncio.sleep(0.01 * (4 - index))
+            return mock_async_stream(fix_response(0.9, f"await step{index}();"))
+
+        mock_acompletion.side_effect = respond
+
+        suggestions = AutoFixGenerator().generate_fixes(failures, max_concurrency=3)
+
+        self.assertEqual(mock_acompletion.call_count, 3)
+        self.assertEqual(
+            [suggestion.file_path for suggestion in suggestions],
+            [failure["file_path"] for failure in failures],
+        )
+        self.assertEqual(
+            [suggestion.suggested_code for suggestion in suggestions],
+            ["await step1();", "await step2();", "await step3();"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
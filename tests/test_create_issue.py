@@ -3,8 +3,10 @@
 Unit tests for GitHub issue creation functionality.
 """
 
+import json
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
@@ -34,8 +36,8 @@ class TestGitHubAPIClient(unittest.TestCase):
         self.error_handler = setup_error_handling(debug_mode=True)
         self.client = GitHubAPIClient("fake_token", "owner/repo", self.error_handler)
 
-    @patch("create_issue.requests.Session.get")
-    def test_search_issues_success(self, mock_get):
+    @patch("create_issue.requests.Session.request")
+    def test_search_issues_success(self, mock_request):
         """Test successful issue search."""
         mock_response = Mock()
         mock_response.status_code = 200
@@ -48,16 +50,42 @@ class TestGitHubAPIClient(unittest.TestCase):
                 }
             ]
         }
-        mock_get.return_value = mock_response
+        mock_request.return_value = mock_response
 
         issues = self.client.search_issues("test query")
 
         self.assertEqual(len(issues), 1)
         self.assertEqual(issues[0]["number"], 1)
-        mock_get.assert_called_once()
+        mock_request.assert_called_once()
+
+    @patch("create_issue.requests.Session.request")
+    def test_search_issues_revalidates_with_etag(self, mock_request):
+        """Test that a repeated search reuses the cached result on 304 Not Modified."""
+        first_response = Mock()
+        first_response.status_code = 200
+        first_response.headers = {"ETag": '"abc123"'}
+        first_response.json.return_value = {"items": [{"number": 1, "title": "Test Issue"}]}
+
+        not_modified = Mock()
+        not_modified.status_code = 304
+        not_modified.headers = {"ETag": '"abc123"'}
+
+        mock_request.side_effect = [first_response, not_modified]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with patch.dict(os.environ, {"AI_CACHE_DIR": cache_dir}):
+                first = self.client.search_issues("test query")
+                second = self.client.search_issues("test query")
+
+        self.assertEqual(first, second)
+        self.assertIsNone(mock_request.call_args_list[0].kwargs["headers"])
+        self.assertEqual(
+            mock_request.call_args_list[1].kwargs["headers"], {"If-None-Match": '"abc123"'}
+        )
+        not_modified.json.assert_not_called()
 
-    @patch("create_issue.requests.Session.post")
-    def test_create_issue_success(self, mock_post):
+    @patch("create_issue.requests.Session.request")
+    def test_create_issue_success(self, mock_request):
         """Test successful issue creation."""
         mock_response = Mock()
         mock_response.status_code = 201
@@ -66,7 +94,7 @@ class TestGitHubAPIClient(unittest.TestCase):
             "html_url": "https://github.com/owner/repo/issues/42",
             "title": "Test Issue",
         }
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
 
         issue = self.client.create_issue(
             title="Test Issue", body="Test body", labels=["bug", "test"], assignees=["user1"]
@@ -76,17 +104,18 @@ class TestGitHubAPIClient(unittest.TestCase):
         self.assertEqual(issue["title"], "Test Issue")
 
         # Verify the request was made correctly
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
-        self.assertIn("json", call_args.kwargs)
-        request_data = call_args.kwargs["json"]
+        mock_request.assert_called_once()
+        call_args = mock_request.call_args
+        self.assertEqual(call_args.args[0], "POST")
+        self.assertEqual(call_args.kwargs["headers"]["Content-Type"], "application/json")
+        request_data = json.loads(call_args.kwargs["data"])
         self.assertEqual(request_data["title"], "Test Issue")
         self.assertEqual(request_data["body"], "Test body")
         self.assertEqual(request_data["labels"], ["bug", "test"])
         self.assertEqual(request_data["assignees"], ["user1"])
 
-    @patch("create_issue.requests.Session.get")
-    def test_rate_limiting(self, mock_get):
+    @patch("create_issue.requests.Session.request")
+    def test_rate_limiting(self, mock_request):
         """Test handling of rate limiting."""
         # First call returns rate limit error
         rate_limit_response = Mock()
@@ -98,35 +127,54 @@ class TestGitHubAPIClient(unittest.TestCase):
         success_response.status_code = 200
         success_response.json.return_value = {"items": []}
 
-        mock_get.side_effect = [rate_limit_response, success_response]
+        mock_request.side_effect = [rate_limit_response, success_response]
 
         with patch("time.sleep") as mock_sleep:
             issues = self.client.search_issues("test")
 
             self.assertEqual(issues, [])
             mock_sleep.assert_called_once_with(1)
-            self.assertEqual(mock_get.call_count, 2)
+            self.assertEqual(mock_request.call_count, 2)
+
+    def test_retry_leaves_rate_limits_to_make_request(self):
+        """Test that the connection pool doesn't also sleep on 429 Retry-After."""
+        self.assertFalse(GitHubAPIClient.RETRY.is_retry("GET", 429, True))
+        self.assertTrue(GitHubAPIClient.RETRY.is_retry("GET", 503, True))
 
-    @patch("create_issue.requests.Session.post")
-    def test_permission_error(self, mock_post):
+    @patch("create_issue.requests.Session.request")
+    def test_permission_error(self, mock_request):
         """Test handling of permission errors."""
         mock_response = Mock()
         mock_response.status_code = 403
         mock_response.text = "Forbidden"
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
 
         with self.assertRaises(ActionError) as context:
             self.client.create_issue("Test", "Body")
 
         self.assertEqual(context.exception.code, ErrorCodes.API_PERMISSION_DENIED)
 
-    @patch("create_issue.requests.Session.post")
-    def test_invalid_token_error(self, mock_post):
+    @patch("create_issue.requests.Session.request")
+    def test_rate_limit_header_error(self, mock_request):
+        """Test that a 403 with no remaining rate limit is reported as a rate limit."""
+        mock_response = Mock()
+        mock_response.status_code = 403
+        mock_response.text = "Forbidden"
+        mock_response.headers = {"X-RateLimit-Remaining": "0"}
+        mock_request.return_value = mock_response
+
+        with self.assertRaises(ActionError) as context:
+            self.client.create_issue("Test", "Body")
+
+        self.assertEqual(context.exception.code, ErrorCodes.API_RATE_LIMIT)
+
+    @patch("create_issue.requests.Session.request")
+    def test_invalid_token_error(self, mock_request):
         """Test handling of invalid token errors."""
         mock_response = Mock()
         mock_response.status_code = 401
         mock_response.text = "Unauthorized"
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
 
         with self.assertRaises(ActionError) as context:
             self.client.create_issue("Test", "Body")
@@ -275,7 +323,7 @@ class TestIssueManager(unittest.TestCase):
         self.assertTrue(was_created)
 
         self.mock_client.create_issue.assert_called_once_with(
-            "Test Issue", "Formatted body", ["bug"], ["user1"]
+            "Test Issue", self._with_marker("Formatted body"), ["bug"], ["user1"]
         )
 
     def test_update_existing_issue(self):
@@ -301,7 +349,39 @@ class TestIssueManager(unittest.TestCase):
         self.assertEqual(issue_url, "https://github.com/owner/repo/issues/24")
         self.assertFalse(was_created)
 
-        self.mock_client.update_issue.assert_called_once_with(24, body="Updated body")
+        self.mock_client.update_issue.assert_called_once_with(
+            24, body=self._with_marker("Updated body")
+        )
+
+    def test_skip_update_when_body_unchanged(self):
+        """Test that an existing issue with the same body digest is not patched."""
+        self.mock_formatter.format_issue_body.return_value = (
+            "Same body\n| **Run ID** | [2](url/2) |\n| **Timestamp** | later |"
+        )
+        previous_body = self._with_marker(
+            "Same body\n| **Run ID** | [1](url/1) |\n| **Timestamp** | earlier |"
+        )
+        self.mock_client.search_issues.return_value = [
+            {
+                "number": 24,
+                "title": "Test Issue",
+                "html_url": "https://github.com/owner/repo/issues/24",
+                "body": previous_body,
+            }
+        ]
+
+        issue_number, _, was_created = self.manager.create_or_update_issue(
+            self.sample_summary, "Test Issue", ["bug"], ["user1"], True
+        )
+
+        self.assertEqual(issue_number, 24)
+        self.assertFalse(was_created)
+        self.mock_client.update_issue.assert_not_called()
+
+    def _with_marker(self, body):
+        """Append the body digest marker the manager adds to issue bodies."""
+        digest = self.manager._body_digest(body)
+        return f"{body}\n\n<!-- body-sha256:{digest} -->"
 
     def test_skip_deduplication(self):
         """Test skipping deduplication when disabled."""
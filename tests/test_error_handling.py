@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for error handling functionality.
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from error_handling import JsonFormatter  # noqa: E402
+
+
+class TestJsonFormatter(unittest.TestCase):
+    """Test cases for JsonFormatter."""
+
+    def make_record(self, exc_info=None, **extra):
+        """Build a log record as logger.error("...", extra=extra) would."""
+        record = logging.LogRecord(
+            name="test",
+            level=logging.ERROR,
+            pathname=__file__,
+            lineno=1,
+            msg="Failed to parse %s",
+            args=("report.json",),
+            exc_info=exc_info,
+        )
+        record.__dict__.update(extra)
+        return record
+
+    def test_format_record(self):
+        """Test that a record formats as one JSON object with its extra fields."""
+        record = self.make_record(code="PARSE_ERROR", severity="high")
+
+        output = JsonFormatter().format(record)
+
+        self.assertNotIn("\n", output)
+        entry = json.loads(output)
+        self.assertEqual(set(entry), {"ts", "level", "msg", "code", "severity"})
+        self.assertEqual(entry["level"], "ERROR")
+        self.assertEqual(entry["msg"], "Failed to parse report.json")
+        self.assertEqual(entry["code"], "PARSE_ERROR")
+        self.assertEqual(entry["severity"], "high")
+
+    def test_format_record_with_exc_info(self):
+        """Test that exception tracebacks are included under "exc"."""
+        try:
+            raise ValueError("bad report")
+        except ValueError:
+            record = self.make_record(exc_info=sys.exc_info())
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(set(entry), {"ts", "level", "msg", "exc"})
+        self.assertIn("Traceback", entry["exc"])
+        self.assertIn("ValueError: bad report", entry["exc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -234,8 +234,8 @@ class TestIntegration(unittest.TestCase):
             "title": "Test Failures - Build #156",
         }
 
-        mock_session.get.return_value = search_response
-        mock_session.post.return_value = create_response
+        responses = {"GET": search_response, "POST": create_response}
+        mock_session.request.side_effect = lambda method, url, **kwargs: responses[method]
 
         # Parse report
         report_path = self.create_temp_report(self.realistic_report)
@@ -260,14 +260,13 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(issue_url, "https://github.com/testorg/testapp/issues/42")
         self.assertTrue(was_created)
 
-        # Verify API calls
-        mock_session.get.assert_called_once()  # Search call
-        mock_session.post.assert_called_once()  # Create call
+        # Verify API calls: one search, then one create
+        methods = [call.args[0] for call in mock_session.request.call_args_list]
+        self.assertEqual(methods, ["GET", "POST"])
 
         # Verify create call parameters
-        create_call = mock_session.post.call_args
-        self.assertIn("json", create_call.kwargs)
-        create_data = create_call.kwargs["json"]
+        create_call = mock_session.request.call_args
+        create_data = json.loads(create_call.kwargs["data"])
         self.assertEqual(create_data["title"], "Test Failures - Build #156")
         self.assertEqual(create_data["labels"], ["bug", "playwright", "ci"])
         self.assertEqual(create_data["assignees"], ["qa-team"])
@@ -300,8 +299,8 @@ class TestIntegration(unittest.TestCase):
             "html_url": "https://github.com/testorg/testapp/issues/24",
         }
 
-        mock_session.get.return_value = search_response
-        mock_session.patch.return_value = update_response
+        responses = {"GET": search_response, "PATCH": update_response}
+        mock_session.request.side_effect = lambda method, url, **kwargs: responses[method]
 
         # Parse report and create issue
         report_path = self.create_temp_report(self.realistic_report)
@@ -320,10 +319,9 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(issue_number, 24)
         self.assertFalse(was_created)
 
-        # Should search but not create
-        mock_session.get.assert_called_once()
-        mock_session.patch.assert_called_once()
-        mock_session.post.assert_not_called()
+        # Should search and update but not create
+        methods = [call.args[0] for call in mock_session.request.call_args_list]
+        self.assertEqual(methods, ["GET", "PATCH"])
 
     def test_error_propagation(self):
         """Test that errors propagate correctly through the pipeline."""